@@ -0,0 +1,436 @@
+"""Async (ASGI) serving mode for the I/O-bound endpoints.
+
+Run with:
+    uvicorn asgi:app --host 127.0.0.1 --port 5000
+
+/chat, /chat/stream, /translate, /text-to-speech and /speech-to-text are served by async
+handlers (httpx + AsyncGroq), so one process can wait on hundreds of Groq/Sarvam
+calls at once instead of holding a worker per request. Their request and
+response shapes are the same as the Flask routes in main.py, and every other
+route is passed through to the Flask app unchanged.
+"""
+import logging
+import time
+from contextlib import asynccontextmanager
+
+import requests
+from a2wsgi import WSGIMiddleware
+from groq import AsyncGroq
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+from werkzeug.utils import secure_filename
+
+import main
+from audio_assembly import assemble_wav, astream_wav
+from chat_stream import SpokenTextExtractor, sse_event
+from metrics import registry, request_timings, server_timing_header, start_request_timings, timer
+from tts import aiter_synthesized_chunks, split_tts_text
+
+async_client = AsyncGroq(api_key=main.GROQ_API_KEY, base_url=main.GROQ_BASE_URL) if main.GROQ_API_KEY else None
+INVALID_JSON_RESPONSE = main.INVALID_JSON_RESPONSE
+
+
+async def read_json(request):
+    """The request's JSON object body, or None if it is missing or malformed."""
+    try:
+        data = await request.json()
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+async def tts_cache_call(method, *args):
+    """Call a TTS cache method, in a worker thread when it may read or write the disk tier."""
+    if main.tts_cache.disk is None:
+        return method(*args)
+    return await run_in_threadpool(method, *args)
+
+
+async def chat(request):
+    try:
+        if async_client is None:
+            return JSONResponse({"error": "GROQ_API_KEY missing"}, status_code=500)
+
+        data = await read_json(request)
+        if data is None:
+            return JSONResponse(INVALID_JSON_RESPONSE, status_code=400)
+        user_message = data.get("message", "").strip()
+        session_id = data.get("session_id", "default")
+        language_code = data.get("language_code", "en-IN")
+
+        if not user_message:
+            return JSONResponse({"error": "User message is required"}, status_code=400)
+
+        # The session store may be SQLite, so session reads and writes run in a worker thread.
+        routed = main.route_chat(user_message, language_code)
+        if routed is not None:
+            return JSONResponse(await run_in_threadpool(
+                main.finish_routed_turn, session_id, user_message, language_code, routed
+            ))
+
+        session = await run_in_threadpool(main.prepare_chat_session, session_id, user_message, language_code)
+
+        with timer("groq_chat"):
+            response = await async_client.chat.completions.create(
+                model=main.CHAT_MODEL,
+                messages=session["messages"],
+                **main.CHAT_COMPLETION_OPTIONS
+            )
+
+        raw_content = response.choices[0].message.content.strip()
+
+        return JSONResponse(await run_in_threadpool(
+            main.finish_chat_turn, session, session_id, user_message, raw_content, getattr(response, "usage", None)
+        ))
+
+    except Exception as e:
+        print("🔥 FULL ERROR:", str(e))
+        return JSONResponse({
+            "error": "Internal server error",
+            "details": str(e)
+        }, status_code=500)
+
+
+async def chat_stream(request):
+    if async_client is None:
+        return JSONResponse({"error": "GROQ_API_KEY missing"}, status_code=500)
+
+    data = await read_json(request)
+    if data is None:
+        return JSONResponse(INVALID_JSON_RESPONSE, status_code=400)
+    user_message = data.get("message", "").strip()
+    session_id = data.get("session_id", "default")
+    language_code = data.get("language_code", "en-IN")
+
+    if not user_message:
+        return JSONResponse({"error": "User message is required"}, status_code=400)
+
+    routed = main.route_chat(user_message, language_code)
+    if routed is not None:
+        return StreamingResponse(
+            main.routed_chat_events(session_id, user_message, language_code, routed),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+
+    try:
+        session = await run_in_threadpool(
+            main.prepare_chat_session, session_id, user_message, language_code, spoken_first=True
+        )
+    except Exception as e:
+        print("🔥 FULL ERROR:", str(e))
+        return JSONResponse({"error": "Internal server error", "details": str(e)}, status_code=500)
+
+    async def generate_events():
+        extractor = SpokenTextExtractor()
+        raw_parts = []
+        try:
+            options = {key: value for key, value in main.CHAT_COMPLETION_OPTIONS.items() if key != "response_format"}
+            with timer("groq_chat_stream"):
+                stream = await async_client.chat.completions.create(
+                    model=main.CHAT_MODEL,
+                    messages=session["messages"],
+                    stream=True,
+                    **options
+                )
+
+                async for chunk in stream:
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if not delta:
+                        continue
+                    raw_parts.append(delta)
+                    yield sse_event("token", {"delta": delta})
+                    for sentence in extractor.feed(delta):
+                        yield sse_event("spoken_sentence", {"text": sentence})
+
+            for sentence in extractor.finish():
+                yield sse_event("spoken_sentence", {"text": sentence})
+
+            raw_content = "".join(raw_parts).strip()
+            body = await run_in_threadpool(main.finish_chat_turn, session, session_id, user_message, raw_content)
+            yield sse_event("done", body)
+
+        except Exception as e:
+            print("🔥 FULL ERROR:", str(e))
+            yield sse_event("error", {"error": "Internal server error", "details": str(e)})
+
+    return StreamingResponse(
+        generate_events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def translate_text(request):
+    try:
+        if not main.SARVAM_API_KEY:
+            return JSONResponse({
+                "error": "SARVAM_API_KEY is not configured on the server. "
+                         "Please set it in a .env file or environment variable before using translation."
+            }, status_code=500)
+
+        data = await read_json(request)
+        if data is None:
+            return JSONResponse(INVALID_JSON_RESPONSE, status_code=400)
+        input_text = data.get("input")
+        source_lang = data.get("source_language_code", "").strip()
+        target_lang = data.get("target_language_code", "").strip()
+        speaker_gender = data.get("speaker_gender", "Female")
+        mode = data.get("mode", "formal")
+        output_script = data.get("output_script", "fully-native")
+        numerals_format = data.get("numerals_format", "international")
+
+        if not input_text or not input_text.strip():
+            return JSONResponse({"error": "Input text is required"}, status_code=400)
+
+        result = await main.translation_service.atranslate(
+            input_text, source_lang, target_lang, speaker_gender, mode, output_script, numerals_format
+        )
+
+        if "translated_text" not in result:
+            return JSONResponse(result, status_code=500)
+
+        if len(input_text) > 1000:
+            return JSONResponse(main.long_translation_response(result))
+        return JSONResponse(main.short_translation_response(result))
+
+    except Exception as e:
+        return JSONResponse({"error": "Internal server error", "details": str(e)}, status_code=500)
+
+
+async def synthesize_tts_chunk(chunk, target_lang, config):
+    """Async version of main.synthesize_tts_chunk (shares its cache)."""
+    with timer("tts_chunk"):
+        return await _synthesize_tts_chunk(chunk, target_lang, config)
+
+
+async def _synthesize_tts_chunk(chunk, target_lang, config):
+    request_body = main.build_tts_request(chunk, target_lang, config)
+
+    cache_key = main.tts_cache.key_for(request_body)
+    cached_audio = await tts_cache_call(main.tts_cache.get, cache_key)
+    if cached_audio is not None:
+        return cached_audio
+
+    headers = {
+        "api-subscription-key": main.SARVAM_API_KEY,
+        "Content-Type": "application/json"
+    }
+
+    response = await main.sarvam_async_http.post(main.TTS_API_URL, headers=headers, json=request_body)
+    audio = main.decode_tts_response(response)
+    if audio is not None:
+        await tts_cache_call(main.tts_cache.set, cache_key, audio)
+    return audio
+
+
+async def text_to_speech(request):
+    try:
+        if not main.SARVAM_API_KEY:
+            return JSONResponse({
+                "error": "SARVAM_API_KEY is not configured on the server. "
+                         "Please set it in a .env file or environment variable before using text-to-speech."
+            }, status_code=500)
+
+        data = await read_json(request)
+        if data is None:
+            return JSONResponse(INVALID_JSON_RESPONSE, status_code=400)
+        text_list = data.get("inputs", [])
+        if not text_list or not isinstance(text_list, list) or not text_list[0].strip():
+            return JSONResponse({"error": "Text is required"}, status_code=400)
+
+        text = text_list[0]
+
+        currLang = data.get("target_language_code")
+        source_lang = data.get("source_language_code", main.lang)
+
+        config = main.LANGUAGE_CONFIG.get(currLang, main.LANGUAGE_CONFIG['en-IN'])
+
+        # 1. Translate text if source and target languages differ
+        if source_lang != currLang:
+            try:
+                with timer("translate"):
+                    translate_result = await main.translation_service.atranslate(text, source_lang, currLang)
+                if "translated_text" in translate_result:
+                    text = translate_result["translated_text"]
+                else:
+                    logging.warning(f"Translation failed for TTS: {translate_result.get('error')}")
+            except Exception as e:
+                logging.error(f"Translation error in TTS: {str(e)}")
+
+        # 2. Synthesize the chunks concurrently
+        chunk_audios = aiter_synthesized_chunks(
+            split_tts_text(text, config["chunk_size"]),
+            lambda chunk: synthesize_tts_chunk(chunk, currLang, config),
+            max_concurrency=main.TTS_MAX_CONCURRENCY
+        )
+
+        if data.get("stream"):
+            first_audio = None
+            try:
+                async for audio in chunk_audios:
+                    if audio is not None:
+                        first_audio = audio
+                        break
+            finally:
+                if first_audio is None:
+                    await chunk_audios.aclose()
+            if first_audio is None:
+                return JSONResponse({"error": "Failed to generate audio"}, status_code=500)
+
+            async def remaining_audio():
+                yield first_audio
+                async for audio in chunk_audios:
+                    yield audio
+
+            async def generate_audio():
+                try:
+                    async for data in astream_wav(remaining_audio(), main.TTS_AUDIO_FORMAT, config["silence_ms"]):
+                        yield data
+                except requests.exceptions.RequestException as e:
+                    logging.error(f"TTS API request failed mid-stream: {str(e)}")
+                finally:
+                    await chunk_audios.aclose()
+
+            return StreamingResponse(generate_audio(), media_type="audio/wav")
+
+        audios = [audio async for audio in chunk_audios]
+        audio_data_combined = assemble_wav(audios, main.TTS_AUDIO_FORMAT, config["silence_ms"])
+        if audio_data_combined is None:
+            return JSONResponse({"error": "Failed to generate audio"}, status_code=500)
+
+        return Response(audio_data_combined, media_type="audio/wav")
+
+    except requests.exceptions.RequestException as e:
+        logging.error(f"TTS API request failed: {str(e)}")
+        return JSONResponse({"error": "API request failed", "details": str(e)}, status_code=500)
+
+    except Exception as e:
+        logging.error(f"Unexpected error in TTS: {str(e)}")
+        return JSONResponse({"error": "Internal server error"}, status_code=500)
+
+
+async def speech_to_text(request):
+    try:
+        form = await request.form()
+    except Exception as e:
+        print("❌ Invalid STT upload:", str(e))
+        return JSONResponse({'error': 'Invalid multipart form data'}, status_code=400)
+    try:
+        audio_file = form.get('audio')
+        if audio_file is None or isinstance(audio_file, str):
+            return JSONResponse({'error': 'No audio file uploaded'}, status_code=400)
+
+        if not main.SARVAM_API_KEY:
+            return JSONResponse({"error": "SARVAM_API_KEY not configured"}, status_code=500)
+
+        if not audio_file.filename:
+            return JSONResponse({'error': 'No selected file'}, status_code=400)
+
+        audio_bytes = await audio_file.read()
+        if not audio_bytes:
+            return JSONResponse({'error': 'Uploaded file is empty'}, status_code=400)
+
+        current_lang = main.lang or "en-IN"
+        print("🔊 STT Language:", current_lang)
+
+        filename = secure_filename(audio_file.filename) or "audio.wav"
+        if main.STT_PREPROCESS:
+            # Decoding and trimming is CPU (and ffmpeg) work; keep it off the event loop.
+            audio_bytes, filename = await run_in_threadpool(main.preprocess_stt_upload, audio_bytes, filename)
+            if audio_bytes is None:
+                return JSONResponse({'error': 'No speech detected in the recording'}, status_code=400)
+
+        response = await main.sarvam_async_http.post(
+            main.STT_API_URL,
+            headers={'api-subscription-key': main.SARVAM_API_KEY},
+            data={'model': 'saarika:v2.5', 'language_code': current_lang},
+            files={'file': (filename, audio_bytes, 'audio/wav')}
+        )
+
+        if response.status_code != 200:
+            print("❌ Sarvam Error:", response.text)
+            return JSONResponse({
+                "error": "Sarvam STT failed",
+                "details": response.text
+            }, status_code=500)
+
+        result = response.json()
+        print("✅ STT Response:", result)
+
+        transcription = result.get('transcript')
+        if not transcription:
+            return JSONResponse({'error': 'No transcript in response'}, status_code=500)
+
+        return JSONResponse({
+            "transcription": transcription,
+            "language_code": current_lang
+        })
+
+    except Exception as e:
+        print("❌ Unexpected STT error:", str(e))
+        return JSONResponse({'error': 'Internal server error'}, status_code=500)
+
+    finally:
+        await form.close()
+
+
+@asynccontextmanager
+async def lifespan(_app):
+    yield
+    await main.sarvam_async_http.aclose()
+    if async_client is not None:
+        await async_client.close()
+
+
+async_app = Starlette(
+    routes=[
+        Route('/chat', chat, methods=['POST']),
+        Route('/chat/stream', chat_stream, methods=['POST']),
+        Route('/translate', translate_text, methods=['POST']),
+        Route('/text-to-speech', text_to_speech, methods=['POST']),
+        Route('/speech-to-text', speech_to_text, methods=['POST'])
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])],
+    lifespan=lifespan
+)
+ASYNC_PATHS = {route.path for route in async_app.routes}
+flask_app = WSGIMiddleware(main.app)
+
+
+async def instrumented_async_app(scope, receive, send):
+    """Run an async endpoint, recording the same request metrics as the Flask hooks in main.py."""
+    started = time.perf_counter()
+    start_request_timings()
+    want_timing = main.SERVER_TIMING_HEADER or (b"x-request-timing", b"1") in scope.get("headers", [])
+
+    async def send_with_metrics(message):
+        if message["type"] == "http.response.start":
+            elapsed = time.perf_counter() - started
+            registry.observe(
+                "http_request_duration_seconds",
+                elapsed,
+                endpoint=scope["path"],
+                method=scope["method"],
+                status=str(message["status"])
+            )
+            if want_timing:
+                header = server_timing_header(request_timings() + [("total", elapsed)])
+                message = dict(message, headers=list(message.get("headers", [])) + [(b"server-timing", header.encode())])
+        await send(message)
+
+    await async_app(scope, receive, send_with_metrics)
+
+
+async def app(scope, receive, send):
+    """Send the async endpoints to Starlette and everything else to Flask (which already handles CORS)."""
+    if scope["type"] == "lifespan":
+        await async_app(scope, receive, send)
+    elif scope.get("path") in ASYNC_PATHS:
+        await instrumented_async_app(scope, receive, send)
+    else:
+        await flask_app(scope, receive, send)
@@ -0,0 +1,144 @@
+"""Joining per-chunk TTS audio into a single WAV.
+
+Sarvam returns each chunk as a complete WAV file (RIFF header + 16-bit PCM at
+the requested speech_sample_rate). Appending those files back to back repeats
+the header mid-stream, so here the PCM payload of every chunk is located with
+`parse_wav` (as a memoryview, without copying), the chunks are joined with
+real silence frames between them, and one header is written for the whole
+answer. `stream_wav` does the same incrementally, for responses that start
+playing before the last chunk is synthesized.
+"""
+import logging
+import struct
+
+# Placeholder RIFF/data sizes for a WAV whose length isn't known yet; players read to the end of the stream.
+STREAMING_SIZE = 0xFFFFFFFF
+
+
+class AudioFormatError(ValueError):
+    """The audio isn't a PCM WAV file, or doesn't match the format being assembled."""
+
+
+class PCMFormat:
+    def __init__(self, sample_rate, channels=1, sample_width=2):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.sample_width = sample_width
+
+    @property
+    def block_align(self):
+        return self.channels * self.sample_width
+
+    def __eq__(self, other):
+        return (
+            isinstance(other, PCMFormat)
+            and (self.sample_rate, self.channels, self.sample_width)
+            == (other.sample_rate, other.channels, other.sample_width)
+        )
+
+    def __repr__(self):
+        return f"PCMFormat({self.sample_rate} Hz, {self.channels} ch, {self.sample_width * 8}-bit)"
+
+    def silence(self, milliseconds):
+        """`milliseconds` of silence as whole PCM frames (8-bit PCM is unsigned, so its silence is 0x80)."""
+        frames = round(self.sample_rate * milliseconds / 1000)
+        return (b"\x80" if self.sample_width == 1 else b"\x00") * (frames * self.block_align)
+
+    def header(self, data_bytes=None):
+        """A 44-byte WAV header; with no `data_bytes` it's marked as a stream of unknown length."""
+        if data_bytes is None:
+            riff_size = data_size = STREAMING_SIZE
+        else:
+            riff_size, data_size = 36 + data_bytes, data_bytes
+        return (
+            struct.pack("<4sI4s", b"RIFF", riff_size, b"WAVE")
+            + struct.pack(
+                "<4sIHHIIHH", b"fmt ", 16, 1, self.channels, self.sample_rate,
+                self.sample_rate * self.block_align, self.block_align, self.sample_width * 8
+            )
+            + struct.pack("<4sI", b"data", data_size)
+        )
+
+
+def parse_wav(audio):
+    """Return (PCMFormat, memoryview of the PCM samples) for a PCM WAV file."""
+    view = memoryview(audio)
+    if len(view) < 12 or view[:4] != b"RIFF" or view[8:12] != b"WAVE":
+        raise AudioFormatError("not a RIFF/WAVE file")
+
+    fmt = None
+    offset = 12
+    while offset + 8 <= len(view):
+        chunk_id, size = struct.unpack_from("<4sI", view, offset)
+        body = offset + 8
+        if chunk_id == b"fmt ":
+            if size < 16 or body + 16 > len(view):
+                raise AudioFormatError("truncated WAV fmt chunk")
+            codec, channels, sample_rate, _, _, bits = struct.unpack_from("<HHIIHH", view, body)
+            if channels == 0 or bits < 8:
+                raise AudioFormatError(f"invalid WAV format: {channels} channels, {bits}-bit")
+            # 0xFFFE is WAVE_FORMAT_EXTENSIBLE, which Sarvam doesn't use for plain PCM but is still PCM here.
+            if codec not in (1, 0xFFFE):
+                raise AudioFormatError(f"unsupported WAV codec {codec}")
+            fmt = PCMFormat(sample_rate, channels, bits // 8)
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise AudioFormatError("WAV data chunk before its fmt chunk")
+            # Streamed WAVs may claim more data than there is; trim to whole frames.
+            end = min(body + size, len(view))
+            end -= (end - body) % fmt.block_align
+            return fmt, view[body:end]
+        offset = body + size + (size & 1)
+    raise AudioFormatError("WAV file has no data chunk")
+
+
+def _pcm_chunks(audios, fmt):
+    """The PCM of each chunk that is a WAV in `fmt`, skipping failed (None) and mismatched chunks."""
+    for audio in audios:
+        if audio is None:
+            continue
+        try:
+            chunk_fmt, pcm = parse_wav(audio)
+            if chunk_fmt != fmt:
+                raise AudioFormatError(f"expected {fmt}, got {chunk_fmt}")
+        except AudioFormatError as e:
+            logging.error(f"Skipping TTS chunk that can't be joined: {e}")
+            continue
+        if len(pcm):
+            yield pcm
+
+
+def assemble_wav(audios, fmt, gap_ms=0):
+    """Join WAV chunks into one WAV with `gap_ms` of silence after each; None if no chunk had audio."""
+    silence = fmt.silence(gap_ms)
+    parts = []
+    for pcm in _pcm_chunks(audios, fmt):
+        parts.append(pcm)
+        if silence:
+            parts.append(silence)
+    if not parts:
+        return None
+    data_bytes = sum(len(part) for part in parts)
+    # join copies each chunk's samples exactly once, straight into the result.
+    return b"".join([fmt.header(data_bytes)] + parts)
+
+
+def stream_wav(audios, fmt, gap_ms=0):
+    """Like `assemble_wav`, but yields the header and then each chunk's samples as soon as they're ready."""
+    silence = fmt.silence(gap_ms)
+    yield fmt.header()
+    for pcm in _pcm_chunks(audios, fmt):
+        yield bytes(pcm)
+        if silence:
+            yield silence
+
+
+async def astream_wav(audios, fmt, gap_ms=0):
+    """Async version of `stream_wav`, for an async iterator of chunk audio."""
+    silence = fmt.silence(gap_ms)
+    yield fmt.header()
+    async for audio in audios:
+        for pcm in _pcm_chunks([audio], fmt):
+            yield bytes(pcm)
+            if silence:
+                yield silence
@@ -0,0 +1,162 @@
+"""Audio clean-up before speech-to-text.
+
+Browsers record webm/ogg/m4a at 44.1-48 kHz, often stereo, with silence on both
+ends. `prepare_stt_audio` decodes the upload (WAV directly, anything else with
+ffmpeg), downmixes it to mono, resamples it to the rate the STT model uses,
+trims leading and trailing silence with a frame-energy voice-activity detector
+and re-encodes it as 16-bit PCM WAV. Clips with no speech at all come back as
+None so they can be rejected without calling Sarvam.
+"""
+import io
+import logging
+import shutil
+import subprocess
+import wave
+
+import numpy as np
+
+# Sarvam's saarika models work on 16 kHz audio.
+STT_SAMPLE_RATE = 16000
+FRAME_MS = 30
+# Speech is any frame this far above the clip's noise floor (and above ABSOLUTE_FLOOR_DB)...
+SPEECH_MARGIN_DB = 12.0
+ABSOLUTE_FLOOR_DB = -50.0
+# ...or within this much of its loudest frame, so a clip that is speech throughout isn't trimmed into.
+PEAK_RANGE_DB = 20.0
+# Keep this much audio around the detected speech so word onsets and tails aren't clipped.
+PADDING_MS = 250
+# Less voiced audio than this is treated as an empty clip.
+MIN_SPEECH_MS = 150
+FFMPEG_TIMEOUT = 30
+# Anti-aliasing filter for downsampling: passes up to this fraction of the new rate (its Nyquist is 0.5)...
+LOWPASS_CUTOFF = 0.45
+# ...with a windowed-sinc FIR of this many taps.
+LOWPASS_TAPS = 101
+
+
+class AudioDecodeError(Exception):
+    """The upload couldn't be decoded (unknown format, or ffmpeg isn't installed)."""
+
+
+def _wav_samples(data):
+    """Mono float32 samples in [-1, 1] and the sample rate of a PCM WAV file, or None if it isn't one."""
+    if data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+        return None
+    try:
+        with wave.open(io.BytesIO(data)) as wav:
+            channels, width, rate = wav.getnchannels(), wav.getsampwidth(), wav.getframerate()
+            frames = wav.readframes(wav.getnframes())
+    except (wave.Error, EOFError):
+        return None
+
+    if width == 1:
+        samples = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif width == 2:
+        samples = np.frombuffer(frames, dtype="<i2").astype(np.float32) / 32768
+    elif width == 4:
+        samples = np.frombuffer(frames, dtype="<i4").astype(np.float32) / 2147483648
+    else:
+        return None
+    samples = samples[:len(samples) // channels * channels]
+    return samples.reshape(-1, channels).mean(axis=1), rate
+
+
+def _ffmpeg_samples(data, sample_rate):
+    """Decode any format ffmpeg understands to mono float32 samples at `sample_rate`."""
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        raise AudioDecodeError("ffmpeg is not installed")
+    try:
+        result = subprocess.run(
+            [ffmpeg, "-nostdin", "-hide_banner", "-loglevel", "error", "-i", "pipe:0",
+             "-f", "s16le", "-acodec", "pcm_s16le", "-ac", "1", "-ar", str(sample_rate), "pipe:1"],
+            input=data,
+            capture_output=True,
+            timeout=FFMPEG_TIMEOUT
+        )
+    except subprocess.TimeoutExpired as e:
+        raise AudioDecodeError("ffmpeg timed out") from e
+    if result.returncode != 0:
+        raise AudioDecodeError(result.stderr.decode(errors="replace").strip() or "ffmpeg failed")
+    return np.frombuffer(result.stdout, dtype="<i2").astype(np.float32) / 32768
+
+
+def lowpass(samples, cutoff_hz, rate, taps=LOWPASS_TAPS):
+    """Windowed-sinc (Hamming) FIR low-pass filter, keeping the signal aligned."""
+    n = np.arange(taps) - (taps - 1) / 2
+    kernel = np.sinc(2 * cutoff_hz / rate * n) * np.hamming(taps)
+    kernel /= kernel.sum()
+    return np.convolve(samples, kernel.astype(np.float32), mode="same")
+
+
+def resample(samples, rate, target_rate):
+    """Resample mono audio. Downsampling low-pass filters first, so content above
+    the new Nyquist frequency doesn't alias into the speech band."""
+    if rate == target_rate or len(samples) == 0:
+        return samples
+    if rate > target_rate:
+        samples = lowpass(samples, LOWPASS_CUTOFF * target_rate, rate)
+        if rate % target_rate == 0:
+            return samples[::rate // target_rate]
+    positions = np.arange(int(len(samples) * target_rate / rate)) * (rate / target_rate)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+def decode_audio(data, sample_rate=STT_SAMPLE_RATE):
+    """Mono float32 samples of an uploaded clip at `sample_rate`."""
+    wav = _wav_samples(data)
+    if wav is not None:
+        samples, rate = wav
+        return resample(samples, rate, sample_rate)
+    return _ffmpeg_samples(data, sample_rate)
+
+
+def speech_bounds(samples, sample_rate=STT_SAMPLE_RATE):
+    """(start, end) sample indices of the speech in a clip, padded, or None if there is none."""
+    frame = sample_rate * FRAME_MS // 1000
+    count = len(samples) // frame
+    if count == 0:
+        return None
+
+    frames = samples[:count * frame].reshape(count, frame)
+    energy_db = 10 * np.log10(np.mean(frames * frames, axis=1) + 1e-10)
+    noise_floor = np.percentile(energy_db, 10)
+    threshold = max(min(noise_floor + SPEECH_MARGIN_DB, energy_db.max() - PEAK_RANGE_DB), ABSOLUTE_FLOOR_DB)
+    voiced = np.flatnonzero(energy_db > threshold)
+    if len(voiced) * FRAME_MS < MIN_SPEECH_MS:
+        return None
+
+    padding = sample_rate * PADDING_MS // 1000
+    return max(0, voiced[0] * frame - padding), min(len(samples), (voiced[-1] + 1) * frame + padding)
+
+
+def encode_wav(samples, sample_rate=STT_SAMPLE_RATE):
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2")
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+
+def prepare_stt_audio(data, sample_rate=STT_SAMPLE_RATE):
+    """Decode, downmix, resample and trim an uploaded clip.
+
+    Returns {"audio": WAV bytes, "duration": seconds kept, "trimmed": seconds cut},
+    or None if the clip has no speech. Raises AudioDecodeError if it can't be decoded.
+    """
+    samples = decode_audio(data, sample_rate)
+    bounds = speech_bounds(samples, sample_rate)
+    if bounds is None:
+        return None
+
+    start, end = bounds
+    speech = samples[start:end]
+    logging.debug(f"STT audio: kept {len(speech) / sample_rate:.2f}s of {len(samples) / sample_rate:.2f}s")
+    return {
+        "audio": encode_wav(speech, sample_rate),
+        "duration": round(len(speech) / sample_rate, 3),
+        "trimmed": round((len(samples) - len(speech)) / sample_rate, 3)
+    }
@@ -0,0 +1,278 @@
+"""Load-test the Python API and report latency percentiles and throughput.
+
+Drives /chat, /translate, /text-to-speech and /read-document with a weighted
+mix of realistic payloads (long Hindi answers, multi-page PDFs) from a fixed
+number of concurrent clients, then prints p50/p95/p99 latency, error counts
+and requests per second for each endpoint. Run it against the API backed by
+bench/mock_upstream.py to measure a change without touching Groq or Sarvam:
+
+    python bench/benchmark.py --base-url http://127.0.0.1:5000 --concurrency 16 --duration 60
+    python bench/benchmark.py --mix chat=1,tts=1 --cold --json results.json
+
+/read-document needs Tesseract and Poppler on the API host; leave it out of
+the mix (e.g. --mix chat=4,translate=3,tts=2) where they aren't installed.
+"""
+import argparse
+import itertools
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+DEFAULT_MIX = "chat=4,translate=3,tts=2,document=1"
+
+CHAT_MESSAGES = [
+    "What is my EMI for 10 lakh at 9% for 20 years?",
+    "मुझे 25 लाख का होम लोन 8.5% पर 15 साल के लिए चाहिए, EMI कितनी होगी?",
+    "Explain the difference between a fixed and a floating interest rate.",
+    "What documents do I need for a personal loan?",
+    "Should I prepay my home loan or invest the money instead?",
+    "प्रोसेसिंग फीस और प्रीपेमेंट पेनल्टी क्या होती है?"
+]
+
+ENGLISH_ANSWER = (
+    "A home loan is repaid in equal monthly instalments called EMIs. Each EMI covers the interest due for "
+    "that month and repays part of the principal. In the early years most of the EMI goes towards interest, "
+    "so prepaying even a small amount at that stage saves a large share of the total interest. "
+    "Before signing, compare the processing fee, the prepayment penalty, and whether the rate is fixed or "
+    "floating. A floating rate moves with the bank's benchmark rate, so your EMI or tenure can change over "
+    "the life of the loan. "
+) * 4
+
+HINDI_ANSWER = (
+    "होम लोन को हर महीने बराबर किस्तों में चुकाया जाता है, जिन्हें ईएमआई कहते हैं। हर ईएमआई में उस महीने का "
+    "ब्याज और मूलधन का कुछ हिस्सा शामिल होता है। शुरुआती सालों में ईएमआई का ज़्यादातर हिस्सा ब्याज में जाता है, "
+    "इसलिए उस समय थोड़ा सा भी प्रीपेमेंट करने से कुल ब्याज में बड़ी बचत होती है। लोन लेने से पहले प्रोसेसिंग फीस, "
+    "प्रीपेमेंट पेनल्टी और ब्याज दर फिक्स्ड है या फ्लोटिंग, यह ज़रूर देखें। "
+) * 3
+
+DOCUMENT_LINES = [
+    "LOAN AGREEMENT",
+    "This agreement is made between the Borrower and the Bank for a home loan.",
+    "Loan amount: Rs. 25,00,000 (Rupees Twenty Five Lakh only).",
+    "Rate of interest: 8.50% per annum, floating, linked to the repo rate.",
+    "Tenure: 240 months. Equated monthly instalment: Rs. 21,696.",
+    "Prepayment: no penalty on floating rate loans for individual borrowers.",
+    "Processing fee: 0.50% of the loan amount plus applicable taxes.",
+    "Late payment: 2% per month on the overdue instalment.",
+    "The Borrower shall keep the property insured for the full tenure of the loan."
+]
+
+
+def make_pdf(pages, marker=""):
+    """A minimal text PDF with `pages` pages of loan-agreement text."""
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # the page tree, filled in below
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"
+    ]
+    page_ids = []
+    for page in range(1, pages + 1):
+        lines = [f"Page {page} {marker}".strip()] + DOCUMENT_LINES * 3
+        text = "BT /F1 11 Tf 50 790 Td 14 TL " + " ".join(
+            "(" + line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ") '" for line in lines
+        ) + " ET"
+        objects.append(f"<< /Length {len(text)} >>\nstream\n{text}\nendstream")
+        content_id = len(objects)
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>"
+        )
+        page_ids.append(len(objects))
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(f'{i} 0 R' for i in page_ids)}] /Count {pages} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        out += f"{offset:010d} 00000 n \n".encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+class Scenarios:
+    """Builds and sends one request per endpoint; `cold` makes every payload unique to defeat caches."""
+
+    def __init__(self, base_url, language, pdf_pages, cold, timeout=120):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.language = language
+        self.pdf_pages = pdf_pages
+        self.cold = cold
+        self.pdf = make_pdf(pdf_pages)
+        self.counter = itertools.count()
+
+    def _unique(self):
+        return f" [{uuid.uuid4().hex[:8]}]" if self.cold else ""
+
+    def chat(self, session):
+        n = next(self.counter)
+        return session.post(f"{self.base_url}/chat", json={
+            "message": CHAT_MESSAGES[n % len(CHAT_MESSAGES)] + self._unique(),
+            "session_id": f"bench-{n % 50}",
+            "language_code": self.language
+        }, timeout=self.timeout)
+
+    def translate(self, session):
+        return session.post(f"{self.base_url}/translate", json={
+            "input": ENGLISH_ANSWER + self._unique(),
+            "source_language_code": "en-IN",
+            "target_language_code": self.language
+        }, timeout=self.timeout)
+
+    def tts(self, session):
+        return session.post(f"{self.base_url}/text-to-speech", json={
+            "inputs": [HINDI_ANSWER + self._unique()],
+            "source_language_code": "hi-IN",
+            "target_language_code": "hi-IN"
+        }, timeout=self.timeout)
+
+    def document(self, session):
+        pdf = make_pdf(self.pdf_pages, uuid.uuid4().hex) if self.cold else self.pdf
+        return session.post(
+            f"{self.base_url}/read-document",
+            files={"document": ("agreement.pdf", pdf, "application/pdf")},
+            data={"language_code": self.language},
+            timeout=self.timeout
+        )
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def parse_mix(mix):
+    weights = {}
+    for item in mix.split(","):
+        name, _, weight = item.partition("=")
+        if not hasattr(Scenarios, name.strip()):
+            raise SystemExit(f"Unknown scenario {name!r}; expected chat, translate, tts or document")
+        weights[name.strip()] = float(weight or 1)
+    return weights
+
+
+def run(scenarios, weights, concurrency, duration, total_requests, seed):
+    """Run the load and return {scenario: [(latency seconds, ok), ...]} plus the wall time."""
+    results = {name: [] for name in weights}
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration if duration else None
+    issued = itertools.count()
+    names = list(weights)
+
+    def client(worker):
+        rng = random.Random(seed + worker)
+        session = requests.Session()
+        while True:
+            if deadline is not None and time.monotonic() >= deadline:
+                return
+            if total_requests is not None and next(issued) >= total_requests:
+                return
+            name = rng.choices(names, weights=[weights[n] for n in names])[0]
+            started = time.perf_counter()
+            try:
+                response = getattr(scenarios, name)(session)
+                # Read streamed bodies to the end so the latency covers the whole response.
+                _ = response.content
+                ok = response.status_code < 400
+            except requests.exceptions.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - started
+            with lock:
+                results[name].append((elapsed, ok))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(client, range(concurrency)))
+    return results, time.perf_counter() - started
+
+
+def summarize(results, wall_time):
+    rows = {}
+    everything = []
+    for name, samples in list(results.items()) + [("all", None)]:
+        samples = samples if samples is not None else everything
+        if name != "all":
+            everything.extend(samples)
+        latencies = sorted(latency for latency, _ in samples)
+        rows[name] = {
+            "requests": len(samples),
+            "errors": sum(1 for _, ok in samples if not ok),
+            "p50_ms": _ms(percentile(latencies, 50)),
+            "p95_ms": _ms(percentile(latencies, 95)),
+            "p99_ms": _ms(percentile(latencies, 99)),
+            "mean_ms": _ms(sum(latencies) / len(latencies)) if latencies else None,
+            "throughput_rps": round(len(samples) / wall_time, 2) if wall_time else None
+        }
+    return rows
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 1) if seconds is not None else None
+
+
+def print_report(rows, wall_time, concurrency):
+    print(f"\n📊 {sum(r['requests'] for n, r in rows.items() if n != 'all')} requests "
+          f"in {wall_time:.1f}s at concurrency {concurrency}\n")
+    header = f"{'endpoint':<10}{'requests':>10}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'mean ms':>10}{'req/s':>9}"
+    print(header)
+    print("-" * len(header))
+    for name, row in rows.items():
+        print(f"{name:<10}{row['requests']:>10}{row['errors']:>8}"
+              + "".join(f"{_fmt(row[key]):>10}" for key in ("p50_ms", "p95_ms", "p99_ms", "mean_ms"))
+              + f"{_fmt(row['throughput_rps']):>9}")
+
+
+def _fmt(value):
+    return "-" if value is None else str(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:5000")
+    parser.add_argument("--concurrency", type=int, default=8, help="Number of concurrent clients.")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to run (ignored with --requests).")
+    parser.add_argument("--requests", type=int, help="Stop after this many requests instead of a duration.")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Weighted scenario mix (default {DEFAULT_MIX}).")
+    parser.add_argument("--language", default="hi-IN", help="Target language for chat, translate and documents.")
+    parser.add_argument("--pdf-pages", type=int, default=4, help="Pages in the /read-document PDF.")
+    parser.add_argument("--cold", action="store_true", help="Make every payload unique so server caches miss.")
+    parser.add_argument("--timeout", type=float, default=120, help="Per-request timeout in seconds.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", metavar="PATH", help="Also write the results to a JSON file.")
+    args = parser.parse_args()
+
+    scenarios = Scenarios(args.base_url, args.language, args.pdf_pages, args.cold, args.timeout)
+    weights = parse_mix(args.mix)
+    duration = None if args.requests else args.duration
+
+    results, wall_time = run(scenarios, weights, args.concurrency, duration, args.requests, args.seed)
+    rows = summarize(results, wall_time)
+    print_report(rows, wall_time, args.concurrency)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "base_url": args.base_url,
+                "concurrency": args.concurrency,
+                "mix": weights,
+                "cold": args.cold,
+                "wall_time_s": round(wall_time, 2),
+                "results": rows
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""Stand-in for the Sarvam and Groq APIs, for load tests and benchmarks.
+
+Emulates Sarvam's /translate, /text-to-speech and /speech-to-text and Groq's
+OpenAI-style /openai/v1/chat/completions (including streaming), each with a
+configurable latency and error distribution. Point the API at it with:
+
+    python bench/mock_upstream.py --port 8800 --latency chat=1.5:0.4 --errors translate=0.02:503
+    SARVAM_BASE_URL=http://127.0.0.1:8800 GROQ_BASE_URL=http://127.0.0.1:8800 \
+        SARVAM_API_KEY=mock GROQ_API_KEY=mock python main.py
+"""
+import argparse
+import asyncio
+import base64
+import io
+import json
+import random
+import time
+import uuid
+import wave
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+# Mean and standard deviation (seconds) of each endpoint's latency, roughly what we see in production.
+DEFAULT_LATENCY = {
+    "translate": (0.35, 0.10),
+    "tts": (0.80, 0.25),
+    "stt": (0.60, 0.15),
+    "chat": (1.20, 0.40)
+}
+
+MOCK_REPLY = {
+    "full_text": (
+        "## Home loan overview\n"
+        "A home loan of 10 lakh at 9% for 20 years has an EMI of about ₹8,997. "
+        "Over the full tenure you would pay roughly ₹11.6 lakh in interest. "
+        "Prepaying even a small amount early on saves a large share of that interest. "
+        "Check the processing fee, the prepayment penalty and whether the rate is fixed or floating."
+    ),
+    "spoken_text": (
+        "Your EMI would be about 8,997 rupees a month. "
+        "Prepaying early saves a lot of interest. "
+        "Do check the processing fee and prepayment terms."
+    )
+}
+
+STT_TRANSCRIPT = "मुझे बीस साल के लिए दस लाख का होम लोन चाहिए"
+
+
+class Profile:
+    """Latency and error settings for the mock endpoints."""
+
+    def __init__(self, latency=None, errors=None, token_delay=0.01, tts_seconds_per_char=0.06, sample_rate=22050):
+        self.latency = dict(DEFAULT_LATENCY, **(latency or {}))
+        self.errors = errors or {}
+        self.token_delay = token_delay
+        self.tts_seconds_per_char = tts_seconds_per_char
+        self.sample_rate = sample_rate
+
+    async def delay(self, endpoint):
+        mean, stddev = self.latency.get(endpoint, (0.0, 0.0))
+        await asyncio.sleep(max(0.0, random.gauss(mean, stddev)))
+
+    def error_response(self, endpoint):
+        """A failure response for this call, or None; drawn from the endpoint's error rate."""
+        rate, status = self.errors.get(endpoint, (0.0, 503))
+        if random.random() < rate:
+            return JSONResponse({"error": {"message": "Injected failure from mock upstream"}}, status_code=status)
+        return None
+
+
+def silent_wav(seconds, sample_rate):
+    """A 16-bit mono WAV of silence, like the audio Sarvam TTS returns."""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(b"\x00\x00" * int(seconds * sample_rate))
+    return buffer.getvalue()
+
+
+def create_app(profile):
+    async def translate(request):
+        body = await request.json()
+        await profile.delay("translate")
+        failure = profile.error_response("translate")
+        if failure is not None:
+            return failure
+        # Echoing the input keeps the line count intact, which batched translation relies on.
+        return JSONResponse({
+            "translated_text": body.get("input", ""),
+            "request_id": uuid.uuid4().hex,
+            "source_language_code": body.get("source_language_code", "en-IN")
+        })
+
+    async def text_to_speech(request):
+        body = await request.json()
+        await profile.delay("tts")
+        failure = profile.error_response("tts")
+        if failure is not None:
+            return failure
+        text = "".join(body.get("inputs", []))
+        sample_rate = int(body.get("speech_sample_rate", profile.sample_rate))
+        audio = silent_wav(len(text) * profile.tts_seconds_per_char, sample_rate)
+        return JSONResponse({"request_id": uuid.uuid4().hex, "audios": [base64.b64encode(audio).decode()]})
+
+    async def speech_to_text(request):
+        form = await request.form()
+        try:
+            await profile.delay("stt")
+            failure = profile.error_response("stt")
+            if failure is not None:
+                return failure
+            return JSONResponse({
+                "request_id": uuid.uuid4().hex,
+                "transcript": STT_TRANSCRIPT,
+                "language_code": form.get("language_code", "hi-IN")
+            })
+        finally:
+            await form.close()
+
+    async def chat_completions(request):
+        body = await request.json()
+        await profile.delay("chat")
+        failure = profile.error_response("chat")
+        if failure is not None:
+            return failure
+
+        content = json.dumps(MOCK_REPLY, ensure_ascii=False)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        model = body.get("model", "mock")
+        prompt_chars = sum(len(message.get("content") or "") for message in body.get("messages", []))
+        usage = {
+            "prompt_tokens": prompt_chars // 4,
+            "completion_tokens": len(content) // 4,
+            "total_tokens": (prompt_chars + len(content)) // 4
+        }
+
+        if not body.get("stream"):
+            return JSONResponse({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": usage
+            })
+
+        async def generate_chunks():
+            # A few characters per chunk, about as Groq streams them.
+            for start in range(0, len(content), 12):
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {"content": content[start:start + 12]}, "finish_reason": None}]
+                }
+                yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+                await asyncio.sleep(profile.token_delay)
+            final = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]
+            }
+            yield f"data: {json.dumps(final)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(generate_chunks(), media_type="text/event-stream")
+
+    return Starlette(routes=[
+        Route("/translate", translate, methods=["POST"]),
+        Route("/text-to-speech", text_to_speech, methods=["POST"]),
+        Route("/speech-to-text", speech_to_text, methods=["POST"]),
+        Route("/openai/v1/chat/completions", chat_completions, methods=["POST"])
+    ])
+
+
+def parse_settings(values, parse_value):
+    """Parse repeated "endpoint=value" options into a dict."""
+    settings = {}
+    for item in values or []:
+        endpoint, _, value = item.partition("=")
+        if endpoint not in DEFAULT_LATENCY:
+            raise SystemExit(f"Unknown endpoint {endpoint!r}; expected one of {', '.join(DEFAULT_LATENCY)}")
+        settings[endpoint] = parse_value(value)
+    return settings
+
+
+def parse_latency(value):
+    mean, _, stddev = value.partition(":")
+    return float(mean), float(stddev or 0)
+
+
+def parse_errors(value):
+    rate, _, status = value.partition(":")
+    return float(rate), int(status or 503)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--latency", action="append", metavar="ENDPOINT=MEAN[:STDDEV]",
+                        help="Latency in seconds for translate, tts, stt or chat (repeatable).")
+    parser.add_argument("--errors", action="append", metavar="ENDPOINT=RATE[:STATUS]",
+                        help="Fraction of calls that fail with STATUS (default 503) (repeatable).")
+    parser.add_argument("--token-delay", type=float, default=0.01,
+                        help="Seconds between streamed chat chunks.")
+    parser.add_argument("--seed", type=int, help="Seed the latency/error draws for repeatable runs.")
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    profile = Profile(
+        latency=parse_settings(args.latency, parse_latency),
+        errors=parse_settings(args.errors, parse_errors),
+        token_delay=args.token_delay
+    )
+    print(f"🧪 Mock upstream on http://{args.host}:{args.port} latency={profile.latency} errors={profile.errors}")
+    uvicorn.run(create_app(profile), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""Small, thread-safe caching primitives shared by the API's result caches."""
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+
+class LRUCache:
+    """In-memory LRU cache bounded by the total size (in bytes) of its values.
+
+    When `ttl` (seconds) is given, entries older than that are treated as misses
+    and dropped on access.
+    """
+
+    def __init__(self, max_bytes, ttl=None, sizeof=len):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sizeof = sizeof
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and item[2] is not None and item[2] <= time.monotonic():
+                del self._items[key]
+                self.current_bytes -= item[1]
+                self.expirations += 1
+                item = None
+
+            if item is None:
+                self.misses += 1
+                return None
+
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def set(self, key, value):
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            # Never let a single oversized value flush the whole cache.
+            return
+
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old[1]
+
+            self._items[key] = (value, size, expires_at)
+            self.current_bytes += size
+
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._items.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "entries": len(self._items),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes
+        }
+
+    def __len__(self):
+        return len(self._items)
+
+
+class DiskCache:
+    """Byte values stored as one file per key under a directory, so they survive restarts.
+
+    When `max_bytes` is given, the least recently used files are deleted once the
+    directory holds more than that.
+    """
+
+    def __init__(self, directory, suffix=".bin", max_bytes=None):
+        self.directory = directory
+        self.suffix = suffix
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.evictions = 0
+        self._sizes = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+        if max_bytes is not None:
+            # Pick up what previous runs left behind, least recently used first.
+            entries = [
+                entry for entry in os.scandir(directory)
+                if entry.is_file() and entry.name.endswith(suffix)
+            ]
+            for entry in sorted(entries, key=lambda entry: entry.stat().st_mtime):
+                self._sizes[entry.name[:-len(suffix)]] = entry.stat().st_size
+                self.current_bytes += entry.stat().st_size
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + self.suffix)
+
+    def get(self, key):
+        try:
+            with open(self._path(key), 'rb') as f:
+                value = f.read()
+        except FileNotFoundError:
+            return None
+
+        if self.max_bytes is not None:
+            with self._lock:
+                if key in self._sizes:
+                    self._sizes[key] = self._sizes.pop(key)
+            try:
+                os.utime(self._path(key))
+            except FileNotFoundError:
+                pass
+        return value
+
+    def set(self, key, value):
+        if self.max_bytes is not None and len(value) > self.max_bytes:
+            return
+
+        # Write to a unique temp name first so readers never see a half-written file.
+        tmp_path = self._path(key) + f".{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(value)
+        os.replace(tmp_path, self._path(key))
+
+        if self.max_bytes is None:
+            return
+
+        evicted = []
+        with self._lock:
+            self.current_bytes += len(value) - self._sizes.pop(key, 0)
+            self._sizes[key] = len(value)
+            while self.current_bytes > self.max_bytes:
+                oldest = next(iter(self._sizes))
+                self.current_bytes -= self._sizes.pop(oldest)
+                self.evictions += 1
+                evicted.append(oldest)
+
+        for oldest in evicted:
+            try:
+                os.remove(self._path(oldest))
+            except FileNotFoundError:
+                pass
+
+    def stats(self):
+        return {
+            "entries": len(self._sizes),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions
+        }
@@ -0,0 +1,293 @@
+"""Answers common /chat messages locally, before they reach Groq.
+
+`ChatRouter.route` returns a reply for two kinds of message and None for
+everything else, which then goes to the LLM as before:
+
+- pure EMI calculations ("EMI for 10 lakh at 9% for 20 years"), answered from
+  `calculate_emi` with a template in the chat language;
+- frequently asked questions, matched against the questions in faq.json by
+  TF-IDF cosine similarity over character n-grams, which works the same way
+  for every script without a tokenizer. A match also has to beat every other
+  entry by a margin and use no words the entry's questions don't, so "gold
+  loan" or "do I NOT need" variants of a question still go to the LLM.
+"""
+import json
+import math
+import re
+from collections import Counter
+
+import numpy as np
+
+from loan_analytics import calculate_emi
+from loan_params import (
+    CURRENCY_WORDS, INDIC_DIGITS, KEYWORD_KINDS, UNIT_KINDS, extract_loan_parameters, is_interest_rate, loan_numbers
+)
+from metrics import timer
+
+# Words that may surround the numbers of a calculation without making it a broader question.
+CALCULATION_WORDS = {
+    "en": "what whats is are my the a an of for at on in to with and over per annum pa p.a emi emis monthly "
+          "instalment installment calculate calculation compute loan home car personal education interest rate "
+          "tenure period how much will would be i me need want take taking get amount principal borrow please "
+          "tell give show s p",
+    "hi": "मेरी मेरा मुझे मैं का की के को पर में लिए लोन ऋण होम कार पर्सनल ईएमआई कितनी कितना होगी होगा क्या है "
+          "चाहिए अवधि राशि बताइए बताओ बताएं से और हर महीने",
+    "te": "నా నాకు లోన్ రుణం ఈఎంఐ ఎంత వడ్డీ రేటు కోసం తో అవుతుంది ఉంటుంది కావాలి హోమ్ గృహ",
+    "ta": "என் எனக்கு கடன் லோன் இஎம்ஐ எவ்வளவு வட்டி விகிதம் ஆகும் வேண்டும் வீட்டு",
+    "kn": "ನನ್ನ ನನಗೆ ಸಾಲ ಲೋನ್ ಇಎಂಐ ಎಷ್ಟು ಬಡ್ಡಿ ದರ ಆಗುತ್ತದೆ ಬೇಕು ಗೃಹ"
+}
+# Words that turn a message with loan numbers into a question for the LLM ("should I prepay or invest?").
+OPEN_QUESTION_WORDS = {
+    "should", "or", "vs", "versus", "compare", "better", "why", "explain", "difference", "prepay", "prepayment",
+    "invest", "afford", "eligible", "eligibility", "reduce", "या", "क्यों", "बेहतर", "तुलना"
+}
+KNOWN_WORDS = set(" ".join(CALCULATION_WORDS.values()).split()) | set(UNIT_KINDS) | set(KEYWORD_KINDS) | {
+    word.lower() for word in CURRENCY_WORDS
+}
+# Indic words take suffixes ("ஆண்டுகளுக்கு", "లోన్‌కు"), so they count as known by prefix.
+KNOWN_INDIC_PREFIX = re.compile("|".join(
+    re.escape(word) for word in sorted((w for w in KNOWN_WORDS if not w.isascii()), key=len, reverse=True)
+))
+WORD_SPLIT = re.compile(r"[\s\d.,!?।॥%₹:;()'\"/@=\-]+")
+# At most this many words a calculation doesn't need, so "EMI for 10 lakh at 9% for 20 years, thanks" still counts.
+MAX_UNKNOWN_WORDS = 1
+# A FAQ match must score this much higher than the best question of any other entry.
+FAQ_MIN_MARGIN = 0.1
+# Words a FAQ question may carry beyond those in the entry's own questions.
+FAQ_FILLER_WORDS = {
+    "please", "kindly", "tell", "me", "about", "a", "an", "the", "my", "i", "you", "can", "could",
+    "मुझे", "कृपया", "बताइए", "बताओ", "बताएं"
+}
+# Shorter words only count as inflections of each other ("document"/"documents") when spelled in full.
+MIN_PREFIX_CHARS = 4
+
+CALCULATION_TEMPLATES = {
+    "en-IN": {
+        "full_text": "## EMI for your loan\n"
+                     "For a loan of ₹{principal} at {rate}% a year over {tenure}, your EMI is ₹{emi} a month.\n"
+                     "You will pay ₹{interest} in interest, ₹{total} in all.",
+        "spoken_text": "Your EMI would be about {emi} rupees a month, with {interest} rupees of interest in total.",
+        "years": "{n} years",
+        "months": "{n} months"
+    },
+    "hi-IN": {
+        "full_text": "## आपके लोन की EMI\n"
+                     "₹{principal} के लोन पर {rate}% सालाना ब्याज और {tenure} की अवधि के लिए आपकी EMI ₹{emi} प्रति माह होगी।\n"
+                     "कुल ब्याज ₹{interest} और कुल भुगतान ₹{total} होगा।",
+        "spoken_text": "आपकी EMI लगभग {emi} रुपये प्रति माह होगी, और कुल ब्याज {interest} रुपये होगा।",
+        "years": "{n} साल",
+        "months": "{n} महीने"
+    },
+    "te-IN": {
+        "full_text": "## మీ లోన్ EMI\n"
+                     "₹{principal} లోన్‌కు సంవత్సరానికి {rate}% వడ్డీతో {tenure} కాలానికి మీ EMI నెలకు ₹{emi}.\n"
+                     "మొత్తం వడ్డీ ₹{interest}, మొత్తం చెల్లింపు ₹{total}.",
+        "spoken_text": "మీ EMI నెలకు సుమారు {emi} రూపాయలు, మొత్తం వడ్డీ {interest} రూపాయలు.",
+        "years": "{n} సంవత్సరాల",
+        "months": "{n} నెలల"
+    },
+    "ta-IN": {
+        "full_text": "## உங்கள் கடன் EMI\n"
+                     "₹{principal} கடனுக்கு ஆண்டுக்கு {rate}% வட்டியில் {tenure} காலத்திற்கு உங்கள் EMI மாதம் ₹{emi}.\n"
+                     "மொத்த வட்டி ₹{interest}, மொத்தச் செலுத்தல் ₹{total}.",
+        "spoken_text": "உங்கள் EMI மாதம் சுமார் {emi} ரூபாய், மொத்த வட்டி {interest} ரூபாய்.",
+        "years": "{n} ஆண்டு",
+        "months": "{n} மாத"
+    },
+    "kn-IN": {
+        "full_text": "## ನಿಮ್ಮ ಸಾಲದ EMI\n"
+                     "₹{principal} ಸಾಲಕ್ಕೆ ವಾರ್ಷಿಕ {rate}% ಬಡ್ಡಿಯಲ್ಲಿ {tenure} ಅವಧಿಗೆ ನಿಮ್ಮ EMI ತಿಂಗಳಿಗೆ ₹{emi}.\n"
+                     "ಒಟ್ಟು ಬಡ್ಡಿ ₹{interest}, ಒಟ್ಟು ಪಾವತಿ ₹{total}.",
+        "spoken_text": "ನಿಮ್ಮ EMI ತಿಂಗಳಿಗೆ ಸುಮಾರು {emi} ರೂಪಾಯಿ, ಒಟ್ಟು ಬಡ್ಡಿ {interest} ರೂಪಾಯಿ.",
+        "years": "{n} ವರ್ಷಗಳ",
+        "months": "{n} ತಿಂಗಳ"
+    }
+}
+
+
+def format_inr(amount):
+    """Format a rupee amount with Indian digit grouping: 1234567.8 -> "12,34,568"."""
+    digits = str(int(round(amount)))
+    if len(digits) <= 3:
+        return digits
+    head, tail = digits[:-3], digits[-3:]
+    groups = []
+    while len(head) > 2:
+        groups.insert(0, head[-2:])
+        head = head[:-2]
+    return ",".join([head] + groups + [tail])
+
+
+def _format_number(value):
+    return f"{value:g}"
+
+
+def normalize_text(text):
+    return " ".join(WORD_SPLIT.split(text.lower().translate(INDIC_DIGITS))).strip()
+
+
+def char_ngrams(text, n=3):
+    padded = f" {normalize_text(text)} "
+    return [padded[i:i + n] for i in range(len(padded) - n + 1)]
+
+
+class FAQIndex:
+    """TF-IDF vectors of character n-grams for every FAQ question, searched by cosine similarity."""
+
+    def __init__(self, entries):
+        self.entries = entries
+        questions = [(index, question) for index, entry in enumerate(entries) for question in entry["questions"]]
+        self.owners = np.array([index for index, _ in questions], dtype=np.intp)
+        self.vocabularies = [
+            {word for question in entry["questions"] for word in normalize_text(question).split()}
+            for entry in entries
+        ]
+        counts = [Counter(char_ngrams(question)) for _, question in questions]
+
+        self.vocabulary = {}
+        for ngrams in counts:
+            for ngram in ngrams:
+                self.vocabulary.setdefault(ngram, len(self.vocabulary))
+
+        document_frequency = np.zeros(len(self.vocabulary))
+        matrix = np.zeros((len(questions), len(self.vocabulary)))
+        for row, ngrams in enumerate(counts):
+            columns = [self.vocabulary[ngram] for ngram in ngrams]
+            document_frequency[columns] += 1
+            matrix[row, columns] = list(ngrams.values())
+
+        self.idf = np.log((1 + len(questions)) / (1 + document_frequency)) + 1
+        # An n-gram no FAQ question has is as rare as it gets.
+        self.unseen_idf = math.log(1 + len(questions)) + 1
+        matrix *= self.idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        self.matrix = matrix / np.where(norms == 0, 1, norms)
+
+    def entry_scores(self, text):
+        """Similarity (0-1) of `text` to each entry's closest question."""
+        scores = np.zeros(len(self.entries))
+        counts = Counter(char_ngrams(text))
+        if not counts or not self.entries:
+            return scores
+
+        vector = np.zeros(len(self.vocabulary))
+        unseen = 0.0
+        for ngram, count in counts.items():
+            column = self.vocabulary.get(ngram)
+            if column is None:
+                unseen += (count * self.unseen_idf) ** 2
+            else:
+                vector[column] = count * self.idf[column]
+        norm = math.sqrt(float(vector @ vector) + unseen)
+
+        np.maximum.at(scores, self.owners, self.matrix @ vector / norm)
+        return scores
+
+    def search(self, text):
+        """The best-matching entry, its similarity and the best score of any other entry (None, 0.0, 0.0 if none)."""
+        scores = self.entry_scores(text)
+        if not len(scores):
+            return None, 0.0, 0.0
+        best = int(np.argmax(scores))
+        runner_up = float(np.delete(scores, best).max()) if len(scores) > 1 else 0.0
+        return self.entries[best], float(scores[best]), runner_up
+
+    def uncovered_words(self, text, entry):
+        """Words of `text` that neither appear in `entry`'s questions (allowing inflections) nor are filler."""
+        vocabulary = self.vocabularies[self.entries.index(entry)]
+        return [
+            word for word in normalize_text(text).split()
+            if word not in vocabulary and word not in FAQ_FILLER_WORDS and not any(
+                min(len(word), len(known)) >= MIN_PREFIX_CHARS and (known.startswith(word) or word.startswith(known))
+                for known in vocabulary
+            )
+        ]
+
+
+class ChatRouter:
+    """Decides whether a chat message can be answered without the LLM."""
+
+    def __init__(self, faq_entries=(), faq_threshold=0.65):
+        self.faq = FAQIndex(list(faq_entries))
+        self.faq_threshold = faq_threshold
+
+    @classmethod
+    def from_file(cls, path, faq_threshold=0.65):
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f), faq_threshold)
+
+    def route(self, message, language_code):
+        """A reply dict ({"intent", "confidence", "full_text", "spoken_text"}) or None to ask the LLM."""
+        with timer("chat_router"):
+            return self.answer_calculation(message, language_code) or self.answer_faq(message, language_code)
+
+    @staticmethod
+    def is_calculation(message):
+        words = [word for word in normalize_text(message).split() if word]
+        if any(word in OPEN_QUESTION_WORDS for word in words):
+            return False
+        unknown = [
+            word for word in words
+            if word not in KNOWN_WORDS and not (not word.isascii() and KNOWN_INDIC_PREFIX.match(word))
+        ]
+        if len(unknown) > MAX_UNKNOWN_WORDS:
+            return False
+
+        # Exactly one loan: a second amount, rate or tenure ("... and 5 lakh at 10% for 10 years") would be
+        # silently dropped, and a percentage that isn't worded as the rate may be a fee.
+        numbers = list(loan_numbers(message))
+        kinds = Counter(kind for kind, _, _ in numbers)
+        amounts = kinds["marked_amount"] or kinds["bare_amount"]
+        if amounts > 1 or kinds["rate"] > 1 or kinds["tenure"] > 1:
+            return False
+        return all(is_interest_rate(match) for kind, _, match in numbers if kind == "rate")
+
+    def answer_calculation(self, message, language_code):
+        template = CALCULATION_TEMPLATES.get(language_code)
+        if template is None:
+            return None
+        params = extract_loan_parameters(message)
+        if params["principal"] is None or params["annual_rate"] is None or not params["tenure_months"]:
+            return None
+        if not self.is_calculation(message):
+            return None
+
+        months = params["tenure_months"]
+        analysis = calculate_emi(params["principal"], params["annual_rate"], months / 12)
+        if months % 12 == 0:
+            tenure = template["years"].format(n=_format_number(months / 12))
+        else:
+            tenure = template["months"].format(n=_format_number(months))
+        values = {
+            "principal": format_inr(params["principal"]),
+            "rate": _format_number(params["annual_rate"]),
+            "tenure": tenure,
+            "emi": format_inr(analysis["emi"]),
+            "interest": format_inr(analysis["total_interest"]),
+            "total": format_inr(analysis["total_payment"])
+        }
+        return {
+            "intent": "calculation",
+            "confidence": 1.0,
+            "full_text": template["full_text"].format(**values),
+            "spoken_text": template["spoken_text"].format(**values)
+        }
+
+    def answer_faq(self, message, language_code):
+        entry, score, runner_up = self.faq.search(message)
+        if entry is None or score < self.faq_threshold or score - runner_up < FAQ_MIN_MARGIN:
+            return None
+        if self.faq.uncovered_words(message, entry):
+            # It asks about something the entry doesn't ("gold loan", "do I NOT need"); let the LLM answer.
+            return None
+        answer = entry["answers"].get(language_code)
+        if answer is None:
+            # No vetted answer in this language; the LLM will write one.
+            return None
+        return {
+            "intent": "faq",
+            "faq_id": entry["id"],
+            "confidence": round(score, 3),
+            "full_text": answer["full_text"],
+            "spoken_text": answer["spoken_text"]
+        }
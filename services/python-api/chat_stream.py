@@ -0,0 +1,164 @@
+"""Incremental parsing of a streamed JSON chat reply, for the SSE /chat/stream endpoint.
+
+The model answers with a JSON object such as
+    {"spoken_text": "...", "full_text": "..."}
+and Groq streams it a few characters at a time. `SpokenTextExtractor` pulls the
+`spoken_text` value out of that stream and hands back each sentence as soon as
+it is complete, so the avatar can start speaking before the reply has finished.
+The last sentence is handed back as soon as the `spoken_text` string closes.
+"""
+import json
+
+from sentences import SENTENCE_END, is_abbreviation
+
+JSON_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+
+class JSONStringFieldStreamer:
+    """Streams the string values of selected top-level keys out of partial JSON text.
+
+    `feed()` returns a list of (key, text) pieces decoded from the newly added
+    characters, and (key, None) when a key's string value closes. It only
+    follows the top-level object, which is all the chat reply needs.
+    """
+
+    def __init__(self, fields):
+        self.fields = set(fields)
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.unicode_digits = None
+        self.pending_surrogate = None
+        self.expect_key = False
+        self.current_key = None
+        self.string_is_key = False
+        self.buffer = []
+
+    def _emit_char(self, ch, out):
+        if self.string_is_key:
+            self.buffer.append(ch)
+        elif self.current_key in self.fields and self.depth == 1:
+            out.append((self.current_key, ch))
+
+    def _decode_unicode(self, code, out):
+        if 0xD800 <= code <= 0xDBFF:
+            self.pending_surrogate = code
+            return
+        if 0xDC00 <= code <= 0xDFFF and self.pending_surrogate is not None:
+            code = 0x10000 + ((self.pending_surrogate - 0xD800) << 10) + (code - 0xDC00)
+        self.pending_surrogate = None
+        self._emit_char(chr(code), out)
+
+    def feed(self, text):
+        out = []
+        for ch in text:
+            if self.in_string:
+                if self.unicode_digits is not None:
+                    self.unicode_digits += ch
+                    if len(self.unicode_digits) == 4:
+                        self._decode_unicode(int(self.unicode_digits, 16), out)
+                        self.unicode_digits = None
+                elif self.escape:
+                    self.escape = False
+                    if ch == 'u':
+                        self.unicode_digits = ""
+                    else:
+                        self._emit_char(JSON_ESCAPES.get(ch, ch), out)
+                elif ch == '\\':
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+                    if self.string_is_key:
+                        self.current_key = "".join(self.buffer)
+                        self.buffer = []
+                    elif self.current_key in self.fields and self.depth == 1:
+                        out.append((self.current_key, None))
+                else:
+                    self._emit_char(ch, out)
+                continue
+
+            if ch == '"':
+                self.in_string = True
+                self.string_is_key = self.depth == 1 and self.expect_key
+                if self.string_is_key:
+                    self.expect_key = False
+            elif ch in '{[':
+                self.depth += 1
+                self.expect_key = self.depth == 1 and ch == '{'
+            elif ch in '}]':
+                self.depth -= 1
+            elif ch == ',' and self.depth == 1:
+                self.expect_key = True
+                self.current_key = None
+
+        # Merge consecutive characters of the same field into one piece.
+        merged = []
+        for key, piece in out:
+            if merged and merged[-1][0] == key and piece is not None and merged[-1][1] is not None:
+                merged[-1] = (key, merged[-1][1] + piece)
+            else:
+                merged.append((key, piece))
+        return merged
+
+
+class SentenceSplitter:
+    """Buffers streamed text and returns whole sentences as they complete.
+
+    A sentence end only counts once the whitespace after it has arrived, so a
+    stream paused at "8.5" or "Rs." isn't cut early, and abbreviations such as
+    "Rs. 10" or "p.a." never end a sentence (see sentences.py).
+    """
+
+    def __init__(self):
+        self.buffer = ""
+
+    def _next_end(self):
+        for match in SENTENCE_END.finditer(self.buffer):
+            if match.end() < len(self.buffer) and not is_abbreviation(self.buffer, match):
+                return match.end()
+        return None
+
+    def feed(self, text):
+        self.buffer += text
+        sentences = []
+        while True:
+            end = self._next_end()
+            if end is None:
+                break
+            sentence = self.buffer[:end].strip()
+            self.buffer = self.buffer[end:]
+            if sentence:
+                sentences.append(sentence)
+        return sentences
+
+    def flush(self):
+        rest = self.buffer.strip()
+        self.buffer = ""
+        return [rest] if rest else []
+
+
+class SpokenTextExtractor:
+    """Feeds streamed reply text in, gets completed `spoken_text` sentences out."""
+
+    def __init__(self, field="spoken_text"):
+        self.field = field
+        self.fields = JSONStringFieldStreamer([field])
+        self.sentences = SentenceSplitter()
+
+    def feed(self, delta):
+        sentences = []
+        for _, text in self.fields.feed(delta):
+            if text is None:
+                # The spoken_text string has closed, so whatever is buffered is its last sentence.
+                sentences.extend(self.sentences.flush())
+            else:
+                sentences.extend(self.sentences.feed(text))
+        return sentences
+
+    def finish(self):
+        return self.sentences.flush()
+
+
+def sse_event(event, data):
+    """Format one server-sent event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
@@ -0,0 +1,86 @@
+"""Result cache for /read-document, keyed on a fingerprint of the uploaded file.
+
+Each document's results are cached in separate layers: its OCR text, the
+English explanation and one vernacular explanation per language. A repeat
+upload skips everything, and a known document in a new language only pays for
+the translation. A bounded in-memory LRU tier sits in front of an optional
+on-disk tier that is capped in size.
+"""
+import hashlib
+import threading
+
+from cache import DiskCache, LRUCache
+
+OCR_LAYER = "ocr"
+EXPLANATION_LAYER = "explanation"
+
+
+def vernacular_layer(language_code):
+    return f"vernacular-{language_code}"
+
+
+class DocumentCache:
+    """Text results of /read-document per (file fingerprint, layer)."""
+
+    def __init__(self, max_bytes, directory=None, disk_max_bytes=None):
+        self.memory = LRUCache(max_bytes)
+        self.disk = DiskCache(directory, suffix=".txt", max_bytes=disk_max_bytes) if directory else None
+        self.hits = {}
+        self.misses = {}
+        self.disk_hits = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(file_bytes):
+        return hashlib.sha256(file_bytes).hexdigest()
+
+    @staticmethod
+    def _layer_name(layer):
+        # Per-language layers are counted together in the stats.
+        return "vernacular" if layer.startswith("vernacular-") else layer
+
+    def get(self, fingerprint, layer):
+        key = f"{fingerprint}-{layer}"
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+                with self._lock:
+                    self.disk_hits += 1
+
+        counters = self.misses if value is None else self.hits
+        name = self._layer_name(layer)
+        with self._lock:
+            counters[name] = counters.get(name, 0) + 1
+        return value.decode("utf-8") if value is not None else None
+
+    def set(self, fingerprint, layer, text):
+        key = f"{fingerprint}-{layer}"
+        value = text.encode("utf-8")
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+    def stats(self):
+        with self._lock:
+            layers = {}
+            for name in sorted(set(self.hits) | set(self.misses)):
+                hits = self.hits.get(name, 0)
+                misses = self.misses.get(name, 0)
+                layers[name] = {
+                    "hits": hits,
+                    "misses": misses,
+                    "hit_rate": round(hits / (hits + misses), 3) if hits + misses else 0.0
+                }
+            disk_hits = self.disk_hits
+
+        return {
+            "layers": layers,
+            "disk_hits": disk_hits,
+            "evictions": self.memory.evictions,
+            "entries": len(self.memory),
+            "bytes": self.memory.current_bytes,
+            "max_bytes": self.memory.max_bytes,
+            "disk": self.disk.stats() if self.disk is not None else None
+        }
@@ -0,0 +1,107 @@
+"""Token-budget-aware compaction of /chat conversation history.
+
+Instead of keeping a fixed number of messages, `HistoryManager.compact()` keeps
+as many recent turns as fit in a prompt token budget and folds older turns into
+a short rolling summary, so long `full_text` replies can't blow up the prompt
+and older context isn't simply dropped.
+"""
+import math
+import re
+from functools import lru_cache
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:"
+
+# Approximate per-message overhead of the chat template (role markers etc.).
+MESSAGE_OVERHEAD_TOKENS = 4
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+FIRST_SENTENCE = re.compile(r"^(.+?[.!?।])(\s|$)")
+
+
+@lru_cache(maxsize=8192)
+def count_tokens(text):
+    """Estimate the LLM token count of `text`.
+
+    Cached per message text, so each turn only counts the messages that are new.
+    Latin words average ~4 characters per token; Indic scripts are split much
+    more finely by the tokenizer, so non-ASCII words count ~2 characters per token.
+    """
+    tokens = 0
+    for piece in TOKEN_PATTERN.findall(text):
+        chars_per_token = 4 if piece.isascii() else 2
+        tokens += math.ceil(len(piece) / chars_per_token)
+    return tokens
+
+
+def message_tokens(message):
+    return count_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+
+def summarize_message(message, max_chars=160):
+    """One short line standing in for a message in the rolling summary."""
+    text = " ".join(message["content"].replace("#", " ").replace("*", " ").split())
+    match = FIRST_SENTENCE.match(text)
+    if match:
+        text = match.group(1)
+    if len(text) > max_chars:
+        text = text[:max_chars].rsplit(" ", 1)[0] + "..."
+    speaker = "User" if message["role"] == "user" else "Assistant"
+    return f"- {speaker}: {text}"
+
+
+class HistoryManager:
+    """Keeps a session's messages within `prompt_token_budget`."""
+
+    def __init__(self, prompt_token_budget=2500, summary_token_budget=300):
+        self.prompt_token_budget = prompt_token_budget
+        self.summary_token_budget = summary_token_budget
+
+    def prompt_tokens(self, messages):
+        return sum(message_tokens(message) for message in messages)
+
+    @staticmethod
+    def _split(messages):
+        """Return (system prompt, summary lines, turns)."""
+        system = []
+        summary_lines = []
+        turns = list(messages)
+        if turns and turns[0]["role"] == "system":
+            system = [turns.pop(0)]
+        if turns and turns[0]["role"] == "system" and turns[0]["content"].startswith(SUMMARY_PREFIX):
+            summary_lines = turns.pop(0)["content"][len(SUMMARY_PREFIX):].strip().splitlines()
+        return system, summary_lines, turns
+
+    def _summary_message(self, summary_lines):
+        # Keep the summary itself bounded by dropping its oldest lines.
+        while summary_lines and count_tokens("\n".join(summary_lines)) > self.summary_token_budget:
+            summary_lines = summary_lines[1:]
+        if not summary_lines:
+            return []
+        return [{"role": "system", "content": SUMMARY_PREFIX + "\n" + "\n".join(summary_lines)}]
+
+    def compact(self, messages):
+        """Fold the oldest turns into the rolling summary until the prompt fits the budget.
+
+        The system prompt and the latest message are always kept.
+        """
+        if self.prompt_tokens(messages) <= self.prompt_token_budget:
+            return messages
+
+        system, summary_lines, turns = self._split(messages)
+        used = self.prompt_tokens(system) + self.prompt_tokens(self._summary_message(summary_lines))
+        used += self.prompt_tokens(turns)
+
+        folded = 0
+        while len(turns) - folded > 1 and used > self.prompt_token_budget:
+            message = turns[folded]
+            line = summarize_message(message)
+            used -= message_tokens(message)
+            used += count_tokens(line) + 1
+            summary_lines.append(line)
+            folded += 1
+
+        # Don't leave an assistant reply at the start without the question it answered.
+        while folded < len(turns) - 1 and turns[folded]["role"] == "assistant":
+            summary_lines.append(summarize_message(turns[folded]))
+            folded += 1
+
+        return system + self._summary_message(summary_lines) + turns[folded:]
@@ -0,0 +1,128 @@
+"""Background job queue for long-running requests such as /read-document.
+
+`JobQueue.submit()` hands work to a local thread pool and returns a job id
+straight away; the caller polls the job's status (with per-stage progress) and
+fetches the result once it's done. The number of queued plus running jobs is
+bounded, so when the pool is saturated `submit()` raises `QueueFull` instead of
+piling up work (the API turns that into a 429).
+
+Jobs live in the memory of the process that accepted them, so with several
+gunicorn workers the status/result requests must reach the same process (run
+the job API with one worker and more threads, or sticky routing).
+"""
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class QueueFull(Exception):
+    """Raised by `JobQueue.submit()` when `max_pending` jobs are already queued or running."""
+
+
+class JobQueue:
+    """Runs `func(*args, progress=...)` jobs on `max_workers` threads.
+
+    `progress(stage, state)` lets a job report per-stage progress, which shows up
+    in `status()`. Finished jobs are kept for `result_ttl` seconds.
+    """
+
+    def __init__(self, max_workers, max_pending, result_ttl=3600, stages=()):
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+        self.stages = tuple(stages)
+        self.submitted = 0
+        self.rejected = 0
+        self._jobs = {}
+        # Finished job ids in the order they finished, so expiry never waits on a long-running job.
+        self._finished = OrderedDict()
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+
+    def submit(self, func, *args):
+        """Queue a job and return its id, or raise QueueFull."""
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._expire()
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise QueueFull(f"{self._pending} jobs already queued or running")
+            self._pending += 1
+            self.submitted += 1
+            self._jobs[job_id] = {
+                "job_id": job_id,
+                "status": "queued",
+                "stages": {stage: "pending" for stage in self.stages},
+                "submitted_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "result": None,
+                "error": None
+            }
+
+        self._pool.submit(self._run, job_id, func, args)
+        return job_id
+
+    def _run(self, job_id, func, args):
+        self._update(job_id, status="running", started_at=time.time())
+
+        def progress(stage, state):
+            with self._lock:
+                self._jobs[job_id]["stages"][stage] = state
+
+        try:
+            result = func(*args, progress=progress)
+            self._update(job_id, status="done", result=result)
+        except Exception as e:
+            logging.error(f"Job {job_id} failed: {str(e)}")
+            self._update(job_id, status="failed", error=str(e))
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self._jobs[job_id]["finished_at"] = time.time()
+                self._finished[job_id] = self._jobs[job_id]["finished_at"]
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            self._jobs[job_id].update(fields)
+
+    def _expire(self):
+        # Finished jobs are kept in finishing order, so stop at the first one that's still wanted.
+        cutoff = time.time() - self.result_ttl
+        while self._finished:
+            job_id, finished_at = next(iter(self._finished.items()))
+            if finished_at > cutoff:
+                break
+            self._finished.popitem(last=False)
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        """Return a snapshot of the job (None if unknown or expired)."""
+        with self._lock:
+            self._expire()
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            return dict(job, stages=dict(job["stages"]))
+
+    def status(self, job_id):
+        """The job as reported by the status endpoint (no result body)."""
+        job = self.get(job_id)
+        if job is None:
+            return None
+        job.pop("result")
+        return job
+
+    def stats(self):
+        with self._lock:
+            self._expire()
+            return {
+                "pending": self._pending,
+                "max_pending": self.max_pending,
+                "jobs": len(self._jobs),
+                "submitted": self.submitted,
+                "rejected": self.rejected
+            }
@@ -0,0 +1,237 @@
+"""Loan maths for /chat and the /loan endpoints, vectorized with NumPy.
+
+`calculate_emi` is the single-loan summary /chat has always returned.
+`amortization_schedule` builds the month-by-month schedule, with prepayments
+and rate changes, from the closed-form balance formula instead of a per-month
+Python loop. `compare_scenarios` prices a whole grid of amounts x rates x
+tenures in one set of array operations.
+"""
+import math
+
+import numpy as np
+
+# Longest schedule we'll build (100 years), so a tiny EMI can't run forever.
+MAX_MONTHS = 1200
+# Most scenarios /loan/compare will price in one request.
+MAX_SCENARIOS = 10000
+
+
+def emi_for(principal, annual_rate, months):
+    """EMI for a loan; every argument may be a scalar or an array (broadcast together)."""
+    principal = np.asarray(principal, dtype=np.float64)
+    months = np.asarray(months, dtype=np.float64)
+    monthly_rate = np.asarray(annual_rate, dtype=np.float64) / 12 / 100
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        growth = (1 + monthly_rate) ** months
+        emi = principal * monthly_rate * growth / (growth - 1)
+    return np.where(monthly_rate == 0, principal / months, emi)
+
+
+def check_loan(principal, annual_rate, tenure):
+    """Raise ValueError unless principal and tenure are positive and the rate is non-negative, all finite."""
+    if not all(math.isfinite(value) for value in (principal, annual_rate, tenure)):
+        raise ValueError("principal, rate and tenure must be finite numbers")
+    if principal <= 0 or tenure <= 0 or annual_rate < 0:
+        raise ValueError("principal and tenure must be positive and the rate can't be negative")
+
+
+def _finite_emi(emi):
+    if not math.isfinite(emi):
+        raise ValueError("loan parameters are too large to compute an EMI")
+    return emi
+
+
+def calculate_emi(principal, annual_rate, tenure_years):
+    check_loan(principal, annual_rate, tenure_years)
+    months = tenure_years * 12
+    emi = _finite_emi(float(emi_for(principal, annual_rate, months)))
+
+    total_payment = emi * months
+    total_interest = total_payment - principal
+
+    return {
+        "emi": round(emi, 2),
+        "total_interest": round(total_interest, 2),
+        "total_payment": round(total_payment, 2)
+    }
+
+
+def _segment(balance, monthly_rate, emi, months):
+    """Amortize `balance` for up to `months` months at a fixed rate and EMI.
+
+    Returns per-month (opening, interest, principal, payment, closing) arrays,
+    stopping early at the month the loan is paid off.
+    """
+    k = np.arange(1, months + 1, dtype=np.float64)
+    if monthly_rate:
+        with np.errstate(invalid="ignore", over="ignore"):
+            growth = (1 + monthly_rate) ** k
+            closing = balance * growth - emi * (growth - 1) / monthly_rate
+    else:
+        closing = balance - emi * k
+    opening = np.concatenate(([balance], closing[:-1]))
+
+    interest = opening * monthly_rate
+    payment = np.full(months, emi)
+
+    paid_off = np.flatnonzero(closing <= 0.005)
+    if len(paid_off):
+        last = paid_off[0] + 1
+        opening, interest, payment, closing = opening[:last], interest[:last], payment[:last], closing[:last]
+        # The final instalment only pays what's left.
+        payment[-1] = opening[-1] + interest[-1]
+        closing[-1] = 0.0
+    return opening, interest, payment - interest, payment, closing
+
+
+def amortization_schedule(principal, annual_rate, tenure_months, prepayments=None, rate_changes=None,
+                          adjust="tenure"):
+    """Month-by-month schedule of a loan.
+
+    `prepayments` maps month -> extra amount paid at the end of that month;
+    `rate_changes` maps month -> new annual rate (%) charged from that month on.
+    After either, `adjust="tenure"` keeps the EMI and shortens (or lengthens)
+    the loan, while `adjust="emi"` keeps the original end date and recomputes
+    the EMI. Returns a dict of per-month columns and a summary. Raises ValueError
+    for a loan that wouldn't be repaid within MAX_MONTHS, rather than returning
+    a schedule that stops with a balance still owed.
+    """
+    check_loan(principal, annual_rate, tenure_months)
+    if tenure_months > MAX_MONTHS:
+        raise ValueError(f"tenure can't be longer than {MAX_MONTHS} months")
+    if adjust not in ("tenure", "emi"):
+        raise ValueError('adjust must be "tenure" or "emi"')
+
+    prepayments = {int(month): float(amount) for month, amount in (prepayments or {}).items()}
+    rate_changes = {int(month): float(rate) for month, rate in (rate_changes or {}).items()}
+    if any(month < 1 for month in list(prepayments) + list(rate_changes)):
+        raise ValueError("prepayment and rate change months must be 1 or later")
+    if not all(math.isfinite(amount) and amount >= 0 for amount in prepayments.values()):
+        raise ValueError("prepayment amounts must be finite and can't be negative")
+    if not all(math.isfinite(rate) and rate >= 0 for rate in rate_changes.values()):
+        raise ValueError("changed rates must be finite and can't be negative")
+    prepayments = {month: amount for month, amount in prepayments.items() if amount > 0}
+    # A new segment starts whenever the rate changes or the month after a prepayment.
+    boundaries = sorted(set(rate_changes) | {month + 1 for month in prepayments})
+
+    columns = {name: [] for name in ("opening_balance", "interest", "principal", "emi", "closing_balance")}
+    rates = []
+    prepaid = []
+    balance = float(principal)
+    rate = float(annual_rate)
+    emi = _finite_emi(float(emi_for(balance, rate, tenure_months)))
+    month = 1
+
+    while balance > 0.005 and month <= MAX_MONTHS:
+        if month in rate_changes:
+            rate = rate_changes[month]
+            # With the EMI kept, a rate rise can leave it below the monthly interest; re-price then too.
+            if adjust == "emi" or emi <= balance * rate / 12 / 100:
+                emi = float(emi_for(balance, rate, max(1, tenure_months - month + 1)))
+
+        next_boundary = next((b for b in boundaries if b > month), MAX_MONTHS + 1)
+        length = next_boundary - month
+        if adjust == "emi":
+            length = min(length, max(1, tenure_months - month + 1))
+
+        opening, interest, principal_paid, payment, closing = _segment(balance, rate / 12 / 100, emi, length)
+        for name, values in zip(columns, (opening, interest, principal_paid, payment, closing)):
+            columns[name].append(values)
+        rates.append(np.full(len(opening), rate))
+        prepaid.append(np.zeros(len(opening)))
+
+        month += len(opening)
+        balance = float(closing[-1])
+
+        prepayment = min(prepayments.get(month - 1, 0.0), balance)
+        if prepayment:
+            prepaid[-1][-1] = prepayment
+            columns["closing_balance"][-1][-1] -= prepayment
+            balance -= prepayment
+            if adjust == "emi" and balance > 0.005:
+                emi = float(emi_for(balance, rate, max(1, tenure_months - month + 1)))
+
+    if balance > 0.005 and math.isfinite(balance):
+        raise ValueError(f"the loan wouldn't be repaid within {MAX_MONTHS} months at this EMI")
+
+    schedule = {name: np.concatenate(parts) for name, parts in columns.items()}
+    if not np.isfinite(schedule["closing_balance"]).all():
+        raise ValueError("loan parameters are too large to compute a schedule")
+    schedule["prepayment"] = np.concatenate(prepaid)
+    schedule["annual_rate"] = np.concatenate(rates)
+    schedule["month"] = np.arange(1, len(schedule["emi"]) + 1)
+
+    total_interest = float(schedule["interest"].sum())
+    total_prepaid = float(schedule["prepayment"].sum())
+    baseline = calculate_emi(principal, annual_rate, tenure_months / 12)
+    summary = {
+        "months": int(len(schedule["month"])),
+        "first_emi": round(float(schedule["emi"][0]), 2),
+        "last_emi": round(float(schedule["emi"][-1]), 2),
+        "total_interest": round(total_interest, 2),
+        "total_prepaid": round(total_prepaid, 2),
+        "total_payment": round(float(schedule["emi"].sum()) + total_prepaid, 2),
+        # Negative when rate rises cost more than the prepayments saved (+ 0.0 avoids "-0.0").
+        "interest_saved": round(baseline["total_interest"] - total_interest, 2) + 0.0
+    }
+    return {"schedule": schedule, "summary": summary}
+
+
+def schedule_rows(schedule):
+    """Turn the schedule's columns into one JSON-friendly dict per month."""
+    names = ["month", "opening_balance", "emi", "interest", "principal", "prepayment", "closing_balance", "annual_rate"]
+    rounded = [
+        schedule[name].tolist() if name == "month" else np.round(schedule[name], 2).tolist()
+        for name in names
+    ]
+    return [dict(zip(names, row)) for row in zip(*rounded)]
+
+
+def compare_scenarios(principals, annual_rates, tenure_years, grid=True):
+    """EMI, total interest and total payment for many loans at once.
+
+    With `grid`, every combination of the three lists is priced (amounts x rates
+    x tenures); otherwise the lists are taken as parallel columns, one loan per
+    position. Returns one dict per scenario.
+    """
+    principals = np.asarray(principals, dtype=np.float64).ravel()
+    annual_rates = np.asarray(annual_rates, dtype=np.float64).ravel()
+    tenure_years = np.asarray(tenure_years, dtype=np.float64).ravel()
+
+    if grid:
+        count = len(principals) * len(annual_rates) * len(tenure_years)
+    else:
+        if not len(principals) == len(annual_rates) == len(tenure_years):
+            raise ValueError("principals, annual_rates and tenure_years must be the same length")
+        count = len(principals)
+    if count == 0:
+        raise ValueError("at least one scenario is required")
+    if count > MAX_SCENARIOS:
+        raise ValueError(f"at most {MAX_SCENARIOS} scenarios can be compared at once (got {count})")
+    if not all(np.isfinite(values).all() for values in (principals, annual_rates, tenure_years)):
+        raise ValueError("principals, rates and tenures must be finite numbers")
+    if (principals <= 0).any() or (tenure_years <= 0).any() or (annual_rates < 0).any():
+        raise ValueError("principals and tenures must be positive and rates can't be negative")
+
+    if grid:
+        principals, annual_rates, tenure_years = (
+            axis.ravel() for axis in np.meshgrid(principals, annual_rates, tenure_years, indexing="ij")
+        )
+
+    months = tenure_years * 12
+    emi = emi_for(principals, annual_rates, months)
+    if not np.isfinite(emi).all():
+        raise ValueError("loan parameters are too large to compute an EMI")
+    total_payment = emi * months
+    total_interest = total_payment - principals
+
+    columns = {
+        "principal": principals,
+        "annual_rate": annual_rates,
+        "tenure_years": tenure_years,
+        "emi": np.round(emi, 2),
+        "total_interest": np.round(total_interest, 2),
+        "total_payment": np.round(total_payment, 2)
+    }
+    names = list(columns)
+    return [dict(zip(names, row)) for row in zip(*(columns[name].tolist() for name in names))]
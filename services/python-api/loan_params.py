@@ -0,0 +1,223 @@
+"""Single-pass extraction of loan amount, interest rate and tenure from a chat message.
+
+Understands Indian number formats ("5 lakh", "2.5 crore", "₹10,00,000", "5L"),
+decimals and percentages ("8.5%", "9 percent"), tenures in years or months,
+the digits of the Indic scripts we support, and the unit words of those
+languages ("10 लाख", "20 साल", "9 प्रतिशत", ...). Everything is matched by one
+precompiled regex in a single `finditer` pass, so it's cheap enough to run on
+every /chat turn.
+"""
+import re
+
+from loan_analytics import calculate_emi
+
+# Devanagari, Bengali, Gurmukhi, Gujarati, Tamil, Telugu, Kannada and Malayalam digits -> ASCII.
+INDIC_DIGITS = str.maketrans({
+    chr(zero + offset): str(offset)
+    for zero in (0x0966, 0x09E6, 0x0A66, 0x0AE6, 0x0BE6, 0x0C66, 0x0CE6, 0x0D66)
+    for offset in range(10)
+})
+
+MULTIPLIER_WORDS = {
+    1e3: ["thousand", "k", "हज़ार", "हजार", "ஆயிரம்", "వేలు", "వెయ్యి", "ಸಾವಿರ", "ആയിരം", "হাজার", "હજાર", "ਹਜ਼ਾਰ"],
+    1e5: ["lakhs", "lakh", "lacs", "lac", "l", "लाख", "லட்சம்", "லட்ச", "లక్షలు", "లక్ష", "ಲಕ್ಷ", "ലക്ഷം",
+          "লাখ", "লক্ষ", "લાખ", "ਲੱਖ"],
+    1e6: ["million", "mn"],
+    1e7: ["crores", "crore", "cr", "करोड़", "करोड", "कोटी", "கோடி", "కోట్లు", "కోటి", "ಕೋಟಿ", "കോടി",
+          "কোটি", "કરોડ", "ਕਰੋੜ"]
+}
+YEAR_WORDS = ["years", "year", "yrs", "yr", "y", "साल", "वर्षों", "वर्षे", "वर्ष", "ஆண்டுகள்", "ஆண்டு", "வருடம்",
+              "வருட", "సంవత్సరాలు", "సంవత్సరం", "సంవత్సర", "ವರ್ಷಗಳು", "ವರ್ಷ", "വർഷം", "വർഷ", "বছর", "વર્ષ", "ਸਾਲ"]
+MONTH_WORDS = ["months", "month", "mos", "mo", "महीनों", "महीने", "महीना", "महिने", "महिना", "माह", "மாதங்கள்",
+               "மாதம்", "மாத", "నెలలు", "నెల", "ತಿಂಗಳು", "ತಿಂಗಳ", "മാസം", "മാസ", "মাস", "મહિના", "ਮਹੀਨੇ", "ਮਹੀਨਾ"]
+PERCENT_WORDS = ["%", "percent", "per cent", "pc", "प्रतिशत", "फीसदी", "टक्के", "சதவீதம்", "சதவீத", "శాతం",
+                 "ಶೇಕಡಾ", "ಶೇ", "ശതമാനം", "শতাংশ", "ટકા", "ਪ੍ਰਤੀਸ਼ਤ"]
+CURRENCY_WORDS = ["₹", "rs", "inr", "rupees", "rupee", "रुपये", "रुपए", "रुपया", "ரூபாய்", "రూపాయలు",
+                  "ರೂಪಾಯಿ", "രൂപ", "টাকা", "રૂપિયા", "ਰੁਪਏ"]
+# Words that make a following bare number the interest rate...
+RATE_KEYWORDS = ["interest", "rate", "roi", "at", "@", "ब्याज", "दर", "வட்டி", "వడ్డీ", "ಬಡ್ಡಿ", "പലിശ", "সুদ",
+                 "વ્યાજ", "ਵਿਆਜ"]
+# ...and words that mean it isn't the loan amount (an EMI, salary or fee mentioned in passing).
+NOT_PRINCIPAL_KEYWORDS = ["emi", "salary", "income", "fee", "fees", "charges", "किस्त", "सैलरी", "वेतन"]
+# Words after a percentage that say it is the interest rate ("9% p.a.", "9% ब्याज")...
+RATE_SUFFIX_WORDS = [word for word in RATE_KEYWORDS if word not in ("at", "@")] + [
+    "p.a.", "p.a", "pa", "per annum", "annual", "annually", "yearly", "सालाना", "वार्षिक", "पर"
+]
+# ...or that it is something else ("2% processing fee"), checked over the next two words.
+NOT_RATE_SUFFIX_WORDS = ["processing", "fee", "fees", "charge", "charges", "gst", "tax", "penalty", "down payment",
+                         "margin", "फीस", "शुल्क", "चार्ज"]
+# Words just before or after a duration that make it the loan's tenure ("for 20 years", "20 साल के लिए")...
+TENURE_PREFIX_WORDS = ["for", "over", "in", "within", "tenure", "term", "period", "duration", "repay", "repaid",
+                       "repayment", "अवधि", "अवधी"]
+TENURE_SUFFIX_WORDS = ["tenure", "term", "loan", "period", "के लिए", "की अवधि", "में", "लोन", "कर्ज"]
+# ...and words that make it someone's age ("30 years old", "मैं 30 साल का हूँ").
+AGE_PREFIX_WORDS = ["age", "aged", "उम्र", "आयु"]
+AGE_SUFFIX_WORDS = ["old", "of age", "का हूँ", "का हूं", "की हूँ", "की हूं", "की उम्र", "उम्र"]
+
+UNIT_KINDS = {}
+for multiplier, words in MULTIPLIER_WORDS.items():
+    UNIT_KINDS.update({word: ("amount", multiplier) for word in words})
+UNIT_KINDS.update({word: ("years", 12) for word in YEAR_WORDS})
+UNIT_KINDS.update({word: ("months", 1) for word in MONTH_WORDS})
+UNIT_KINDS.update({word: ("rate", 1) for word in PERCENT_WORDS})
+KEYWORD_KINDS = dict(
+    {word: "rate" for word in RATE_KEYWORDS},
+    **{word: "not_principal" for word in NOT_PRINCIPAL_KEYWORDS}
+)
+
+
+def _alternation(words):
+    # Longest first, so "lakhs" wins over "lakh" and "l".
+    return "|".join(re.escape(word) for word in sorted(words, key=len, reverse=True))
+
+
+def _is_latin(word):
+    return word.isascii() and word[-1].isalpha()
+
+
+# Latin words must end at a word boundary ("5 lakhs", not the "l" of "5 loans");
+# Indic words end in combining marks, so they're matched as plain prefixes.
+LATIN_UNITS = _alternation(word for word in UNIT_KINDS if _is_latin(word))
+OTHER_UNITS = _alternation(word for word in UNIT_KINDS if not _is_latin(word))
+LATIN_KEYWORDS = _alternation(word for word in KEYWORD_KINDS if _is_latin(word))
+OTHER_KEYWORDS = _alternation(word for word in KEYWORD_KINDS if not _is_latin(word))
+CURRENCY = (
+    rf"\b(?:{_alternation(word for word in CURRENCY_WORDS if _is_latin(word))})\b\.?"
+    rf"|{_alternation(word for word in CURRENCY_WORDS if not _is_latin(word))}"
+)
+
+NUMBER_PATTERN = re.compile(
+    rf"""
+    (?:(?P<keyword>\b(?:{LATIN_KEYWORDS})\b|{OTHER_KEYWORDS})(?P<gap>[^\d\n]{{0,20}}?))?
+    (?P<currency>(?:{CURRENCY})\s*)?
+    (?P<number>\d{{1,3}}(?:,\d{{2,3}})+(?:\.\d+)?|\d+(?:\.\d+)?)
+    (?:\s*-?\s*(?P<unit>(?:{LATIN_UNITS})(?![a-z])|{OTHER_UNITS}))?
+    (?P<trailing_currency>\s*(?:{CURRENCY}))?
+    """,
+    re.IGNORECASE | re.VERBOSE
+)
+
+RATE_SUFFIX = re.compile(rf"\s*(?:{_alternation(RATE_SUFFIX_WORDS)})", re.IGNORECASE)
+NOT_RATE_SUFFIX = re.compile(rf"\s*(?:\S+\s+)?(?:{_alternation(NOT_RATE_SUFFIX_WORDS)})", re.IGNORECASE)
+# Matched against the text before the number, so they're anchored at its end.
+TENURE_PREFIX = re.compile(rf"(?:{_alternation(TENURE_PREFIX_WORDS)})(?:\s+(?:a|an|of|about|around))?[\s:=-]*$",
+                           re.IGNORECASE)
+AGE_PREFIX = re.compile(rf"(?:{_alternation(AGE_PREFIX_WORDS)})(?:\s+(?:of|is))?[\s:=-]*$", re.IGNORECASE)
+TENURE_SUFFIX = re.compile(rf"[\s-]*(?:{_alternation(TENURE_SUFFIX_WORDS)})", re.IGNORECASE)
+AGE_SUFFIX = re.compile(rf"\s*(?:{_alternation(AGE_SUFFIX_WORDS)})", re.IGNORECASE)
+
+# "EMI of 20000" describes the EMI, but "EMI for 10 lakh" asks about a loan of 10 lakh.
+DIRECT_GAP = re.compile(r"[\s:=-]*(?:(?:of|is|was|about|around|approx|की|का|है)[\s:=-]*)*", re.IGNORECASE)
+
+# Sanity limits for a bare number to be taken as a rate (% p.a.) or an amount (rupees).
+MAX_RATE = 50
+MIN_BARE_AMOUNT = 1000
+
+
+def loan_numbers(text):
+    """Every loan number in `text` as (kind, value, match), in order.
+
+    `kind` is "rate" (% a year), "tenure" (months), "marked_amount" (written
+    with a currency or a lakh/crore unit) or "bare_amount"; numbers that are
+    none of these (an EMI or salary quoted in passing, small bare numbers, an
+    age such as "30 years old") are left out.
+    """
+    for match in NUMBER_PATTERN.finditer(text.translate(INDIC_DIGITS)):
+        value = float(match.group("number").replace(",", ""))
+        unit = (match.group("unit") or "").lower()
+        keyword = (match.group("keyword") or "").lower()
+        gap = match.group("gap") or ""
+        kind, factor = UNIT_KINDS.get(unit, (None, 1))
+        keyword_kind = KEYWORD_KINDS.get(keyword)
+        has_currency = bool(match.group("currency") or match.group("trailing_currency"))
+
+        if kind == "rate":
+            yield "rate", value, match
+        elif kind in ("years", "months"):
+            if not _is_age(match):
+                yield "tenure", value * factor, match
+        elif keyword_kind == "not_principal" and DIRECT_GAP.fullmatch(gap) and (kind != "amount" or gap.strip()):
+            # "EMI 20000" or "EMI of 1 lakh" is an EMI, but "EMI 10 lakh" is shorthand for a 10 lakh loan.
+            continue
+        elif kind == "amount" or has_currency:
+            yield "marked_amount", value * factor, match
+        elif keyword_kind == "rate" and 0 < value <= MAX_RATE:
+            yield "rate", value, match
+        elif value >= MIN_BARE_AMOUNT:
+            yield "bare_amount", value, match
+
+
+def is_interest_rate(match):
+    """Whether a "rate" match from `loan_numbers` is worded as an interest rate.
+
+    It needs a rate word before it ("at 9%", "interest 7.9") or after it
+    ("9% p.a."), and mustn't be followed by a fee ("at 2% processing fee").
+    """
+    after = match.string[match.end():]
+    if NOT_RATE_SUFFIX.match(after):
+        return False
+    return KEYWORD_KINDS.get((match.group("keyword") or "").lower()) == "rate" or bool(RATE_SUFFIX.match(after))
+
+
+def _is_age(match):
+    before = match.string[:match.start("number")]
+    return bool(AGE_PREFIX.search(before[-20:]) or AGE_SUFFIX.match(match.string, match.end()))
+
+
+def is_loan_tenure(match):
+    """Whether a "tenure" match from `loan_numbers` is worded as the loan's tenure.
+
+    It needs a tenure word before it ("for 20 years", "tenure 240 months") or
+    after it ("20-year tenure", "15 साल के लिए").
+    """
+    before = match.string[:match.start("number")]
+    return bool(TENURE_PREFIX.search(before[-20:]) or TENURE_SUFFIX.match(match.string, match.end()))
+
+
+def extract_loan_parameters(text):
+    """Return {"principal", "annual_rate", "tenure_months"}, with None for anything not found.
+
+    The principal is the largest amount mentioned (preferring ones written with
+    a currency or a lakh/crore unit), so "EMI for 10 lakh" isn't read as a
+    principal of 10 and an EMI or salary quoted alongside isn't taken as the loan.
+    The tenure is the first duration worded as one ("for 3 years"), falling back
+    to the first duration, so other periods mentioned ("I have worked 5 years")
+    don't displace it.
+    """
+    marked_amounts = []
+    bare_amounts = []
+    annual_rate = None
+    tenure_months = None
+    tenure_worded = False
+
+    for kind, value, match in loan_numbers(text):
+        if kind == "rate":
+            if annual_rate is None:
+                annual_rate = value
+        elif kind == "tenure":
+            worded = is_loan_tenure(match)
+            if tenure_months is None or (worded and not tenure_worded):
+                tenure_months, tenure_worded = value, worded
+        elif kind == "marked_amount":
+            marked_amounts.append(value)
+        else:
+            bare_amounts.append(value)
+
+    amounts = marked_amounts or bare_amounts
+    return {
+        "principal": max(amounts) if amounts else None,
+        "annual_rate": annual_rate,
+        "tenure_months": tenure_months
+    }
+
+
+def analyze_loan(text):
+    """EMI summary for the loan described in `text`, or None if any parameter is missing or unusable."""
+    params = extract_loan_parameters(text)
+    if params["principal"] is None or params["annual_rate"] is None or not params["tenure_months"]:
+        return None
+    try:
+        return calculate_emi(params["principal"], params["annual_rate"], params["tenure_months"] / 12)
+    except ValueError:
+        # e.g. a principal or rate too large for the EMI to be a finite number.
+        return None
@@ -1,21 +1,37 @@
-from flask import Flask, request, jsonify, send_file, render_template
+from flask import Flask, Response, g, request, jsonify, render_template
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
 import os
 import requests
 import json
 import base64
-from io import BytesIO
 from dotenv import load_dotenv
 import logging
 from groq import Groq
-import re
-from pdf2image import convert_from_bytes
-# --- TESSERACT OCR IMPORTS & CONFIGURATION (Free Local Solution) ---
-import pytesseract
-from PIL import Image
-from io import BytesIO
 import math
+import time
+import itertools
+import contextvars
+import queue
+import threading
+from tts import TTSAudioCache, iter_synthesized_chunks, split_tts_text
+from translation import TranslationService
+from upstream import AsyncUpstreamClient, UpstreamClient
+from chat_stream import SpokenTextExtractor, sse_event
+from sessions import MemorySessionStore, SQLiteSessionStore
+from history import HistoryManager
+from doc_cache import EXPLANATION_LAYER, OCR_LAYER, DocumentCache, vernacular_layer
+from jobs import JobQueue, QueueFull
+from metrics import registry, request_timings, server_timing_header, start_request_timings, timer
+from loan_analytics import amortization_schedule, compare_scenarios, schedule_rows
+from loan_params import analyze_loan
+from chat_router import ChatRouter
+from turn_pipeline import TurnPipeline
+from spooled_upload import SpooledRequest, upload_size
+from audio_preprocess import AudioDecodeError, prepare_stt_audio
+from audio_assembly import PCMFormat, assemble_wav, stream_wav
+# --- TESSERACT OCR (Free Local Solution); Tesseract/Poppler path config lives in ocr.py ---
+from ocr import ocr_until
 
 # Load environment variables
 load_dotenv()
@@ -24,31 +40,31 @@ lang = "en-IN"
 # Logging configuration (set early so configuration warnings are visible)
 logging.basicConfig(level=logging.INFO)
 
-# --- TESSERACT PATH CONFIG (WINDOWS-FRIENDLY) ---
-# Prefer an environment variable so you don't have to edit code:
-#   TESSERACT_PATH=C:\Program Files\Tesseract-OCR\tesseract.exe
-TESSERACT_PATH = os.getenv("TESSERACT_PATH", r"C:\Program Files\Tesseract-OCR\tesseract.exe")
-if os.name == "nt":
-    if os.path.exists(TESSERACT_PATH):
-        pytesseract.pytesseract.tesseract_cmd = TESSERACT_PATH
-        logging.info(f"Using Tesseract at: {TESSERACT_PATH}")
-    else:
-        logging.warning(
-            "Tesseract not found at default path. "
-            "Set TESSERACT_PATH env var to your Tesseract executable or add it to PATH."
-        )
-
 # Flask app setup
 app = Flask(__name__, static_folder='static', template_folder="templates")
 CORS(app, resources={r"/*": {"origins": "*"}})
 
-# Upload folder for audio files
-UPLOAD_FOLDER = 'uploads'
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+# Per-request stage timings are returned in a Server-Timing header when SERVER_TIMING_HEADER=1,
+# or for any request sent with "X-Request-Timing: 1".
+SERVER_TIMING_HEADER = os.getenv("SERVER_TIMING_HEADER", "0") == "1"
+
+# Only this much OCR text goes into the /read-document explanation prompt.
+DOCUMENT_PROMPT_CHARS = 4000
+# "early_exit" (the default) stops OCR once the prompt has enough text, which is what saves
+# CPU on long documents. "background" only hides latency: it still OCRs every page, finishing
+# them while the LLM runs, so raw_text is complete and the OCR result can be cached.
+DOCUMENT_OCR_MODE = os.getenv("DOCUMENT_OCR_MODE", "early_exit")
+
+# Uploaded files stay in memory up to UPLOAD_SPOOL_MAX_BYTES and only spill to an
+# anonymous temp file beyond that (see spooled_upload.py).
+SpooledRequest.spool_max_bytes = int(os.getenv("UPLOAD_SPOOL_MAX_BYTES", str(2 * 1024 * 1024)))
+app.request_class = SpooledRequest
 app.config['MAX_CONTENT_LENGTH'] = 10 * 1024 * 1024 
 SARVAM_API_KEY = os.getenv('SARVAM_API_KEY')
 GROQ_API_KEY = os.getenv('GROQ_API_KEY')
+# Point these at a stand-in server (see bench/mock_upstream.py) to test or benchmark without the real APIs.
+SARVAM_BASE_URL = os.getenv("SARVAM_BASE_URL", "https://api.sarvam.ai").rstrip("/")
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL") or None
 
 # Log missing API keys instead of crashing the whole app.
 if not SARVAM_API_KEY:
@@ -57,13 +73,121 @@ if not GROQ_API_KEY:
     logging.warning("GROQ_API_KEY is missing. Chat and document explanation features will return errors until it is set.")
 
 # Initialize Groq client only if API key is present
-client = Groq(api_key=GROQ_API_KEY) if GROQ_API_KEY else None
-conversation_sessions = {}
-TRANSLATE_API_URL = "https://api.sarvam.ai/translate"
+client = Groq(api_key=GROQ_API_KEY, base_url=GROQ_BASE_URL) if GROQ_API_KEY else None
+# Conversation history per session_id. SESSION_STORE=sqlite shares it between
+# workers/processes through SESSION_DB_PATH; the default keeps it in-process.
+# History is kept within CHAT_PROMPT_TOKEN_BUDGET; older turns are folded into a rolling summary.
+history_manager = HistoryManager(
+    prompt_token_budget=int(os.getenv("CHAT_PROMPT_TOKEN_BUDGET", "2500")),
+    summary_token_budget=int(os.getenv("CHAT_SUMMARY_TOKEN_BUDGET", "300"))
+)
+SESSION_IDLE_TTL = int(os.getenv("SESSION_IDLE_TTL", str(60 * 60)))
+if os.getenv("SESSION_STORE", "memory") == "sqlite":
+    session_store = SQLiteSessionStore(
+        os.getenv("SESSION_DB_PATH", "sessions.db"),
+        idle_ttl=SESSION_IDLE_TTL,
+        max_sessions=int(os.getenv("SESSION_MAX_COUNT", "10000")),
+        trim=history_manager.compact
+    )
+else:
+    session_store = MemorySessionStore(
+        max_bytes=int(os.getenv("SESSION_MAX_BYTES", str(32 * 1024 * 1024))),
+        idle_ttl=SESSION_IDLE_TTL,
+        trim=history_manager.compact
+    )
+TRANSLATE_API_URL = f"{SARVAM_BASE_URL}/translate"
+TTS_API_URL = f"{SARVAM_BASE_URL}/text-to-speech"
+STT_API_URL = f"{SARVAM_BASE_URL}/speech-to-text"
 ALLOWED_EXTENSIONS = {'wav', 'mp3', 'ogg', 'm4a', 'webm'}
+# Uploads to /speech-to-text are decoded, downmixed, resampled to 16 kHz and trimmed of
+# silence before they're sent to Sarvam; set STT_PREPROCESS=0 to forward them untouched.
+STT_PREPROCESS = os.getenv("STT_PREPROCESS", "1") != "0"
+
+# Maximum number of TTS chunks synthesized in parallel for a single request.
+TTS_MAX_CONCURRENCY = int(os.getenv("TTS_MAX_CONCURRENCY", "4"))
+
+# Pooled keep-alive client (with timeouts, retries and a circuit breaker) for every Sarvam call.
+SARVAM_HTTP_OPTIONS = {
+    "pool_maxsize": int(os.getenv("SARVAM_POOL_MAXSIZE", "20")),
+    "connect_timeout": float(os.getenv("SARVAM_CONNECT_TIMEOUT", "3.05")),
+    "read_timeout": float(os.getenv("SARVAM_READ_TIMEOUT", "30")),
+    "max_retries": int(os.getenv("SARVAM_MAX_RETRIES", "2")),
+    # Total seconds one call may spend on attempts and backoff; keep it under the worker timeout.
+    "max_total_time": float(os.getenv("SARVAM_MAX_TOTAL_TIME", "25")),
+    "failure_threshold": int(os.getenv("SARVAM_CIRCUIT_FAILURES", "5")),
+    "reset_timeout": float(os.getenv("SARVAM_CIRCUIT_RESET", "30"))
+}
+sarvam_http = UpstreamClient(**SARVAM_HTTP_OPTIONS)
+# Used by the async handlers in asgi.py; its connection pools are only opened on first use.
+sarvam_async_http = AsyncUpstreamClient(**SARVAM_HTTP_OPTIONS)
+
+# Every Sarvam translate call goes through this service, which caches translations per sentence.
+translation_service = TranslationService(
+    sarvam_http,
+    TRANSLATE_API_URL,
+    SARVAM_API_KEY,
+    cache_max_bytes=int(os.getenv("TRANSLATION_CACHE_MAX_BYTES", str(16 * 1024 * 1024))),
+    cache_ttl=int(os.getenv("TRANSLATION_CACHE_TTL", str(24 * 60 * 60))),
+    max_concurrency=int(os.getenv("TRANSLATION_MAX_CONCURRENCY", "4")),
+    async_http=sarvam_async_http
+)
+
+# Cache of synthesized chunk audio. Set TTS_CACHE_DIR to also keep it on disk across restarts,
+# capped at TTS_CACHE_DISK_MAX_BYTES.
+tts_cache = TTSAudioCache(
+    max_bytes=int(os.getenv("TTS_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    directory=os.getenv("TTS_CACHE_DIR") or None,
+    disk_max_bytes=int(os.getenv("TTS_CACHE_DISK_MAX_BYTES", str(1024 * 1024 * 1024)))
+)
+
+# /read-document results per uploaded file (OCR text, explanation, translations).
+# Set DOCUMENT_CACHE_DIR to also keep them on disk, capped at DOCUMENT_CACHE_DISK_MAX_BYTES.
+document_cache = DocumentCache(
+    max_bytes=int(os.getenv("DOCUMENT_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+    directory=os.getenv("DOCUMENT_CACHE_DIR") or None,
+    disk_max_bytes=int(os.getenv("DOCUMENT_CACHE_DISK_MAX_BYTES", str(512 * 1024 * 1024)))
+)
+
+# Worker pool behind the /documents/jobs API. Submissions beyond DOCUMENT_JOB_MAX_PENDING
+# queued or running jobs are turned away with a 429.
+document_jobs = JobQueue(
+    max_workers=int(os.getenv("DOCUMENT_JOB_WORKERS", "2")),
+    max_pending=int(os.getenv("DOCUMENT_JOB_MAX_PENDING", "16")),
+    result_ttl=int(os.getenv("DOCUMENT_JOB_RESULT_TTL", str(60 * 60))),
+    stages=("ocr", "explain", "translate")
+)
+
+# --- UPDATED CONFIGURATION FOR VALID SARVAM SPEAKERS/MODELS ---
+# NOTE: For model 'bulbul:v2' the allowed speakers (per Sarvam docs)
+# are: 'anushka', 'abhilash', 'manisha', 'vidya', 'arya', 'karun', 'hitesh'.
+# To avoid validation errors, we only use this set below.
+# Sarvam TTS returns 16-bit mono WAV at this rate; multi-chunk answers are joined into one WAV
+# with silence_ms of silence after each chunk (see audio_assembly.py).
+TTS_SAMPLE_RATE = int(os.getenv("TTS_SAMPLE_RATE", "22050"))
+TTS_AUDIO_FORMAT = PCMFormat(TTS_SAMPLE_RATE)
+LANGUAGE_CONFIG = {
+    'en-IN': {"model": "bulbul:v2", "chunk_size": 500, "silence_ms": 50, "speaker": "anushka"},
+    'hi-IN': {"model": "bulbul:v2", "chunk_size": 300, "silence_ms": 70, "speaker": "abhilash"},
+    'ta-IN': {"model": "bulbul:v2", "chunk_size": 300, "silence_ms": 70, "speaker": "vidya"},
+    'te-IN': {"model": "bulbul:v2", "chunk_size": 300, "silence_ms": 70, "speaker": "karun"},
+    'kn-IN': {"model": "bulbul:v2", "chunk_size": 300, "silence_ms": 70, "speaker": "hitesh"},
+    'ml-IN': {"model": "bulbul:v2", "chunk_size": 300, "silence_ms": 70, "speaker": "arya"},
+    'mr-IN': {"model": "bulbul:v2", "chunk_size": 300, "silence_ms": 70, "speaker": "manisha"},
+    'bn-IN': {"model": "bulbul:v2", "chunk_size": 300, "silence_ms": 70, "speaker": "anushka"},
+    'gu-IN': {"model": "bulbul:v2", "chunk_size": 300, "silence_ms": 70, "speaker": "karun"},
+    'pa-IN': {"model": "bulbul:v2", "chunk_size": 300, "silence_ms": 70, "speaker": "hitesh"}
+}
 
 # NOTE: Google Cloud Vision client initialization code REMOVED.
 
+INVALID_JSON_RESPONSE = {"error": "Request body must be a JSON object"}
+
+
+def read_json():
+    """The request's JSON object body, or None if it is missing or malformed."""
+    data = request.get_json(silent=True)
+    return data if isinstance(data, dict) else None
+
 def allowed_file(filename):
     """Check if the uploaded file has an allowed extension."""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -74,11 +198,55 @@ def home():
     return render_template("index.html")
 
 
+@app.before_request
+def start_request_metrics():
+    g.request_started = time.perf_counter()
+    start_request_timings()
+
+
+@app.after_request
+def record_request_metrics(response):
+    """Record the request's latency (up to the response headers, for streamed responses)."""
+    elapsed = time.perf_counter() - g.get("request_started", time.perf_counter())
+    endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    registry.observe(
+        "http_request_duration_seconds",
+        elapsed,
+        endpoint=endpoint,
+        method=request.method,
+        status=str(response.status_code)
+    )
+    if SERVER_TIMING_HEADER or request.headers.get("X-Request-Timing") == "1":
+        response.headers["Server-Timing"] = server_timing_header(request_timings() + [("total", elapsed)])
+    return response
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Latency histograms and upstream error/retry counters in the Prometheus text format."""
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+
+@app.route('/cache-stats', methods=['GET'])
+def cache_stats():
+    """Report hit/miss/eviction counters for the server-side caches, and the Sarvam circuit breakers."""
+    return jsonify({
+        "tts": tts_cache.stats(),
+        "translation": translation_service.stats(),
+        "sessions": session_store.stats(),
+        "documents": document_cache.stats(),
+        "document_jobs": document_jobs.stats(),
+        "upstream": {"sync": sarvam_http.stats(), "async": sarvam_async_http.stats()}
+    })
+
+
 @app.route('/set-language', methods=['POST'])
 def set_language():
     """Set the default language for the application."""
     global lang
-    data = request.json
+    data = read_json()
+    if data is None:
+        return jsonify(INVALID_JSON_RESPONSE), 400
     new_lang = data.get("language_code", "").strip()
 
     if not new_lang:
@@ -88,32 +256,221 @@ def set_language():
     lang = new_lang
     return jsonify({"message": f"Language changed to {lang}"}), 200
 
-def calculate_emi(principal, annual_rate, tenure_years):
-    monthly_rate = annual_rate / 12 / 100
-    months = tenure_years * 12
+@app.route('/loan/schedule', methods=['POST'])
+def loan_schedule():
+    """Month-by-month amortization schedule, with optional prepayments and rate changes.
+
+    Body: principal, annual_rate, tenure_years (or tenure_months), and optionally
+    prepayments [{"month", "amount"}], rate_changes [{"month", "annual_rate"}] and
+    adjust ("tenure" keeps the EMI, "emi" keeps the end date).
+    """
+    data = read_json()
+    if data is None:
+        return jsonify(INVALID_JSON_RESPONSE), 400
+    try:
+        tenure_months = data.get("tenure_months") or float(data["tenure_years"]) * 12
+        result = amortization_schedule(
+            float(data["principal"]),
+            float(data["annual_rate"]),
+            int(round(float(tenure_months))),
+            prepayments={int(p["month"]): float(p["amount"]) for p in data.get("prepayments", [])},
+            rate_changes={int(c["month"]): float(c["annual_rate"]) for c in data.get("rate_changes", [])},
+            adjust=data.get("adjust", "tenure")
+        )
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid loan parameters: {e}"}), 400
+
+    return jsonify({"summary": result["summary"], "schedule": schedule_rows(result["schedule"])})
+
+
+@app.route('/loan/compare', methods=['POST'])
+def loan_compare():
+    """EMI and totals for many loan scenarios in one call.
+
+    Body: principals, annual_rates and tenure_years lists. With "grid": true (the
+    default) every combination is priced; otherwise the lists are parallel. An
+    optional "sort_by" (e.g. "total_interest" or "emi") orders the rows.
+    """
+    data = read_json()
+    if data is None:
+        return jsonify(INVALID_JSON_RESPONSE), 400
+    try:
+        rows = compare_scenarios(
+            data["principals"],
+            data["annual_rates"],
+            data["tenure_years"],
+            grid=data.get("grid", True)
+        )
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid loan scenarios: {e}"}), 400
+
+    sort_by = data.get("sort_by")
+    if sort_by:
+        if not isinstance(sort_by, str) or sort_by not in rows[0]:
+            return jsonify({"error": f"Cannot sort by {sort_by!r}"}), 400
+        rows.sort(key=lambda row: row[sort_by])
+
+    return jsonify({"count": len(rows), "scenarios": rows})
+
+# Map language codes to readable names
+CHAT_LANGUAGE_NAMES = {
+    "en-IN": "English",
+    "hi-IN": "Hindi",
+    "te-IN": "Telugu",
+    "ta-IN": "Tamil",
+    "kn-IN": "Kannada"
+}
+
+# EMI calculations and FAQ matches (see faq.json) are answered without calling Groq;
+# set CHAT_ROUTER=0 to send every message to the LLM.
+CHAT_ROUTER_ENABLED = os.getenv("CHAT_ROUTER", "1") != "0"
+chat_router = ChatRouter.from_file(
+    os.getenv("CHAT_ROUTER_FAQ_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "faq.json")),
+    faq_threshold=float(os.getenv("CHAT_ROUTER_FAQ_THRESHOLD", "0.65"))
+) if CHAT_ROUTER_ENABLED else None
+
+CHAT_MODEL = "llama-3.3-70b-versatile"
+CHAT_COMPLETION_OPTIONS = {
+    "temperature": 0.2,
+    "max_tokens": 1200,
+    "response_format": {"type": "json_object"}
+}
+
+
+def build_chat_system_prompt(selected_language, spoken_first=False):
+    # When streaming, ask for spoken_text first so the avatar can start speaking
+    # while the longer full_text is still being generated.
+    if spoken_first:
+        json_format = """{
+  "spoken_text": "...short conversational summary...",
+  "full_text": "...detailed explanation..."
+}"""
+    else:
+        json_format = """{
+  "full_text": "...detailed explanation...",
+  "spoken_text": "...short conversational summary..."
+}"""
+
+    return f"""
+You are a knowledgeable financial assistant specializing in loans.
+
+When the user asks about a loan:
+• Provide complete explanation including all the required like intrest rates,etc.. and important considerations.
+• Do NOT ask unnecessary follow-up questions.
+• Respond completely in {selected_language}.
+• Keep answers structured and clear.
+
+Return ONLY valid JSON:
+{json_format}
+"""
+
+
+def prepare_chat_session(session_id, user_message, language_code, spoken_first=False):
+    """Load the session history, add the user's message and return the session to send to Groq."""
+    selected_language = CHAT_LANGUAGE_NAMES.get(language_code, "English")
 
-    if monthly_rate == 0:
-        emi = principal / months
+    # New and expired sessions start with an empty history
+    session = {"messages": session_store.load(session_id)}
+
+    # Always reset system prompt cleanly
+    system_prompt = build_chat_system_prompt(selected_language, spoken_first)
+
+    # Replace or insert system message safely
+    if len(session["messages"]) == 0 or session["messages"][0]["role"] != "system":
+        session["messages"].insert(0, {"role": "system", "content": system_prompt})
     else:
-        emi = (principal * monthly_rate * (1 + monthly_rate) ** months) / \
-              ((1 + monthly_rate) ** months - 1)
+        session["messages"][0]["content"] = system_prompt
+
+    # Add user message
+    session["messages"].append({
+        "role": "user",
+        "content": user_message
+    })
+
+    session["messages"] = session_store.trim(session["messages"])
+    session["prompt_tokens"] = history_manager.prompt_tokens(session["messages"])
 
-    total_payment = emi * months
-    total_interest = total_payment - principal
+    return session
+
+
+def finish_chat_turn(session, session_id, user_message, raw_content, usage=None):
+    """Parse Groq's reply, store it in the session and build the /chat response body.
+
+    `usage` is Groq's token usage for the call, when available; otherwise the
+    reported prompt_tokens is our own estimate.
+    """
+    # Try parsing JSON safely (streamed replies aren't in JSON mode and may wrap it in extra text)
+    try:
+        try:
+            parsed = json.loads(raw_content)
+        except ValueError:
+            parsed = json.loads(raw_content[raw_content.index("{"):raw_content.rindex("}") + 1])
+        final_full = parsed.get("full_text", raw_content)
+        final_spoken = parsed.get("spoken_text", final_full)
+    except Exception:
+        final_full = raw_content
+        final_spoken = raw_content
+
+    # Store assistant response in session
+    session["messages"].append({
+        "role": "assistant",
+        "content": final_full
+    })
+    session_store.save(session_id, session["messages"])
+    loan_analysis = analyze_loan(user_message)
 
     return {
-        "emi": round(emi, 2),
-        "total_interest": round(total_interest, 2),
-        "total_payment": round(total_payment, 2)
+        "full_text": final_full,
+        "spoken_text": final_spoken,
+        "analysis": loan_analysis,
+        "session_id": session_id,
+        "prompt_tokens": usage.prompt_tokens if usage is not None else session["prompt_tokens"]
     }
 
+
+def route_chat(user_message, language_code):
+    """The local router's answer to this message, or None if it should go to Groq."""
+    if chat_router is None:
+        return None
+    routed = chat_router.route(user_message, language_code)
+    if routed is not None:
+        registry.inc("chat_routed_total", intent=routed["intent"])
+    return routed
+
+
+def finish_routed_turn(session_id, user_message, language_code, routed, spoken_first=False):
+    """Record a locally answered message in the session and build the same body /chat returns."""
+    session = prepare_chat_session(session_id, user_message, language_code, spoken_first)
+    raw_content = json.dumps(
+        {"full_text": routed["full_text"], "spoken_text": routed["spoken_text"]}, ensure_ascii=False
+    )
+    body = finish_chat_turn(session, session_id, user_message, raw_content)
+    body["routed"] = routed["intent"]
+    return body
+
+
+def routed_chat_events(session_id, user_message, language_code, routed):
+    """The /chat/stream events for a locally answered message: the whole reply at once, then `done`."""
+    body = finish_routed_turn(session_id, user_message, language_code, routed, spoken_first=True)
+    raw_content = json.dumps(
+        {"spoken_text": routed["spoken_text"], "full_text": routed["full_text"]}, ensure_ascii=False
+    )
+    extractor = SpokenTextExtractor()
+    yield sse_event("token", {"delta": raw_content})
+    for sentence in extractor.feed(raw_content) + extractor.finish():
+        yield sse_event("spoken_sentence", {"text": sentence})
+    yield sse_event("done", body)
+
+
 @app.route('/chat', methods=['POST'])
 def chat():
     try:
         if client is None:
             return jsonify({"error": "GROQ_API_KEY missing"}), 500
 
-        data = request.json
+        data = read_json()
+        if data is None:
+            return jsonify(INVALID_JSON_RESPONSE), 400
         user_message = data.get("message", "").strip()
         session_id = data.get("session_id", "default")
         language_code = data.get("language_code", "en-IN")
@@ -121,223 +478,301 @@ def chat():
         if not user_message:
             return jsonify({"error": "User message is required"}), 400
 
-        # Map language codes to readable names
-        language_map = {
-            "en-IN": "English",
-            "hi-IN": "Hindi",
-            "te-IN": "Telugu",
-            "ta-IN": "Tamil",
-            "kn-IN": "Kannada"
-        }
+        routed = route_chat(user_message, language_code)
+        if routed is not None:
+            return jsonify(finish_routed_turn(session_id, user_message, language_code, routed))
 
-        selected_language = language_map.get(language_code, "English")
+        session = prepare_chat_session(session_id, user_message, language_code)
 
-        # Create session if new
-        if session_id not in conversation_sessions:
-            conversation_sessions[session_id] = {
-                "messages": []
-            }
+        # Call Groq
+        with timer("groq_chat"):
+            response = client.chat.completions.create(
+                model=CHAT_MODEL,
+                messages=session["messages"],
+                **CHAT_COMPLETION_OPTIONS
+            )
 
-        session = conversation_sessions[session_id]
+        raw_content = response.choices[0].message.content.strip()
 
-        # Always reset system prompt cleanly
-        system_prompt = f"""
-You are a knowledgeable financial assistant specializing in loans.
+        return jsonify(finish_chat_turn(session, session_id, user_message, raw_content, getattr(response, "usage", None)))
 
-When the user asks about a loan:
-• Provide complete explanation including all the required like intrest rates,etc.. and important considerations.
-• Do NOT ask unnecessary follow-up questions.
-• Respond completely in {selected_language}.
-• Keep answers structured and clear.
+    except Exception as e:
+        print("🔥 FULL ERROR:", str(e))
+        return jsonify({
+            "error": "Internal server error",
+            "details": str(e)
+        }), 500
 
-Return ONLY valid JSON:
-{{
-  "full_text": "...detailed explanation...",
-  "spoken_text": "...short conversational summary..."
-}}
-"""
 
-        # Replace or insert system message safely
-        if len(session["messages"]) == 0 or session["messages"][0]["role"] != "system":
-            session["messages"].insert(0, {"role": "system", "content": system_prompt})
-        else:
-            session["messages"][0]["content"] = system_prompt
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    """Streaming variant of /chat that sends server-sent events.
 
-        # Add user message
-        session["messages"].append({
-            "role": "user",
-            "content": user_message
-        })
+    Events: `token` for each raw chunk from Groq, `spoken_sentence` whenever a
+    sentence of spoken_text is complete, then `done` with the same body /chat
+    returns (or `error`).
+    """
+    if client is None:
+        return jsonify({"error": "GROQ_API_KEY missing"}), 500
+
+    data = read_json()
+    if data is None:
+        return jsonify(INVALID_JSON_RESPONSE), 400
+    user_message = data.get("message", "").strip()
+    session_id = data.get("session_id", "default")
+    language_code = data.get("language_code", "en-IN")
+
+    if not user_message:
+        return jsonify({"error": "User message is required"}), 400
+
+    routed = route_chat(user_message, language_code)
+    if routed is not None:
+        return Response(
+            routed_chat_events(session_id, user_message, language_code, routed),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
 
-        # 🔥 Keep conversation short to prevent token overflow
-        if len(session["messages"]) > 8:
-            session["messages"] = [session["messages"][0]] + session["messages"][-6:]
+    session = prepare_chat_session(session_id, user_message, language_code, spoken_first=True)
 
+    def generate_events():
+        extractor = SpokenTextExtractor()
+        raw_parts = []
+        try:
+            # Groq's JSON mode can't be streamed, so this relies on the prompt asking for JSON.
+            options = {key: value for key, value in CHAT_COMPLETION_OPTIONS.items() if key != "response_format"}
+            with timer("groq_chat_stream"):
+                stream = client.chat.completions.create(
+                    model=CHAT_MODEL,
+                    messages=session["messages"],
+                    stream=True,
+                    **options
+                )
+
+                for chunk in stream:
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if not delta:
+                        continue
+                    raw_parts.append(delta)
+                    yield sse_event("token", {"delta": delta})
+                    for sentence in extractor.feed(delta):
+                        yield sse_event("spoken_sentence", {"text": sentence})
+
+            for sentence in extractor.finish():
+                yield sse_event("spoken_sentence", {"text": sentence})
+
+            raw_content = "".join(raw_parts).strip()
+            yield sse_event("done", finish_chat_turn(session, session_id, user_message, raw_content))
 
-        # Call Groq
-        response = client.chat.completions.create(
-    model="llama-3.3-70b-versatile",
-    messages=session["messages"],
-    temperature=0.2,
-    max_tokens=1200,
-    response_format={"type": "json_object"}
-)
+        except Exception as e:
+            print("🔥 FULL ERROR:", str(e))
+            yield sse_event("error", {"error": "Internal server error", "details": str(e)})
 
+    return Response(
+        generate_events(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
-        raw_content = response.choices[0].message.content.strip()
 
-        # Try parsing JSON safely
+def synthesize_speech(text, target_lang, config):
+    """WAV audio for a piece of text, in as many TTS requests as it needs (None if they all failed)."""
+    audios = [synthesize_tts_chunk(chunk, target_lang, config) for chunk in split_tts_text(text, config["chunk_size"])]
+    return assemble_wav(audios, TTS_AUDIO_FORMAT, config["silence_ms"])
+
+
+@app.route('/turn', methods=['POST'])
+def turn():
+    """One avatar turn in a single request: the chat answer, translated and spoken, as server-sent events.
+
+    Each spoken sentence is translated (when the chat language isn't the speech
+    language) and synthesized while Groq is still writing the rest of the
+    answer. Events: `text` {index, text} and `audio` {index, audio (base64
+    WAV), mime_type} for every sentence in order, then `done` with the same
+    body /chat returns (or `error`).
+    """
+    if not SARVAM_API_KEY:
+        return jsonify({"error": "SARVAM_API_KEY not configured"}), 500
+
+    data = read_json()
+    if data is None:
+        return jsonify(INVALID_JSON_RESPONSE), 400
+    user_message = data.get("message", "").strip()
+    session_id = data.get("session_id", "default")
+    language_code = data.get("language_code", "en-IN")
+
+    if not user_message:
+        return jsonify({"error": "User message is required"}), 400
+
+    routed = route_chat(user_message, language_code)
+    if routed is None and client is None:
+        return jsonify({"error": "GROQ_API_KEY missing"}), 500
+    session = None if routed is not None else prepare_chat_session(
+        session_id, user_message, language_code, spoken_first=True
+    )
+
+    config = LANGUAGE_CONFIG.get(language_code, LANGUAGE_CONFIG['en-IN'])
+    # Groq answers in English for languages it isn't prompted in; those sentences are translated before TTS.
+    answer_lang = language_code if language_code in CHAT_LANGUAGE_NAMES else "en-IN"
+
+    def translate(text):
+        with timer("translate"):
+            return translation_service.translate(text, answer_lang, language_code).get("translated_text")
+
+    # Groq deltas and "a sentence is ready" notices from the pipeline, so finished sentences
+    # are sent as soon as they're ready rather than only when the next delta arrives.
+    updates = queue.Queue()
+    pipeline = TurnPipeline(
+        translate if answer_lang != language_code else None,
+        lambda text: synthesize_speech(text, language_code, config),
+        max_concurrency=TTS_MAX_CONCURRENCY,
+        on_update=lambda: updates.put(("ready", None))
+    )
+
+    def read_groq_stream(stop):
+        """Push the reply's deltas onto `updates` (from a reader thread), then "end" or "error"."""
         try:
-            parsed = json.loads(raw_content)
-            final_full = parsed.get("full_text", raw_content)
-            final_spoken = parsed.get("spoken_text", final_full)
-        except Exception:
-            final_full = raw_content
-            final_spoken = raw_content
-
-        # Store assistant response in session
-        session["messages"].append({
-            "role": "assistant",
-            "content": final_full
-        })
-        loan_analysis = None
-        amount_match = re.search(r'(\d+)', user_message)
-        rate_match = re.search(r'(\d+)%', user_message)
-        year_match = re.search(r'(\d+)\s*(year|years)', user_message)
+            options = {key: value for key, value in CHAT_COMPLETION_OPTIONS.items() if key != "response_format"}
+            with timer("groq_chat_stream"):
+                stream = client.chat.completions.create(
+                    model=CHAT_MODEL,
+                    messages=session["messages"],
+                    stream=True,
+                    **options
+                )
+                for chunk in stream:
+                    if stop.is_set():
+                        # The client went away; stop reading the reply.
+                        getattr(stream, "close", lambda: None)()
+                        return
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        updates.put(("delta", delta))
+            updates.put(("end", None))
+        except Exception as e:
+            updates.put(("error", e))
 
-        if amount_match and rate_match and year_match:
-            principal = float(amount_match.group(1))
-            rate = float(rate_match.group(1))
-            years = float(year_match.group(1))
+    def generate_events():
+        extractor = SpokenTextExtractor()
+        try:
+            if routed is not None:
+                spoken = json.dumps({"spoken_text": routed["spoken_text"]}, ensure_ascii=False)
+                for sentence in extractor.feed(spoken) + extractor.finish():
+                    pipeline.add(sentence)
+                body = finish_routed_turn(session_id, user_message, language_code, routed, spoken_first=True)
+            else:
+                raw_parts = []
+                stop = threading.Event()
+                # The reader runs in a copy of this context so the Groq timing counts towards the request.
+                threading.Thread(
+                    target=contextvars.copy_context().run, args=(read_groq_stream, stop),
+                    name="turn-groq", daemon=True
+                ).start()
+                try:
+                    while True:
+                        kind, value = updates.get()
+                        if kind == "error":
+                            raise value
+                        if kind == "end":
+                            break
+                        if kind == "delta":
+                            raw_parts.append(value)
+                            for sentence in extractor.feed(value):
+                                pipeline.add(sentence)
+                        # Send whatever earlier sentences have finished in the meantime
+                        for event, payload in pipeline.events():
+                            yield sse_event(event, payload)
+                finally:
+                    stop.set()
+
+                for sentence in extractor.finish():
+                    pipeline.add(sentence)
+                body = finish_chat_turn(session, session_id, user_message, "".join(raw_parts).strip())
+
+            # The reply wasn't the JSON we asked for, so nothing was picked out of it while streaming
+            if not pipeline.segments and body["spoken_text"]:
+                pipeline.add(body["spoken_text"])
+
+            for event, payload in pipeline.events(wait=True):
+                yield sse_event(event, payload)
+            yield sse_event("done", body)
 
-            loan_analysis = calculate_emi(principal, rate, years)
+        except Exception as e:
+            print("🔥 FULL ERROR:", str(e))
+            yield sse_event("error", {"error": "Internal server error", "details": str(e)})
 
-        return jsonify({
-            "full_text": final_full,
-            "spoken_text": final_spoken,
-            "analysis": loan_analysis,
-            "session_id": session_id
-        })
+        finally:
+            pipeline.close()
 
-    except Exception as e:
-        print("🔥 FULL ERROR:", str(e))
-        return jsonify({
-            "error": "Internal server error",
-            "details": str(e)
-        }), 500
+    return Response(
+        generate_events(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
-def perform_translation(input_text, source_lang, target_lang, speaker_gender, mode, output_script, numerals_format):
-    """Perform translation request to Sarvam AI API (Helper for /translate)"""
-    try:
-        if not SARVAM_API_KEY:
-            return jsonify({
-                "error": "SARVAM_API_KEY is not configured on the server. "
-                         "Please set it in a .env file or environment variable before using translation."
-            }), 500
+def short_translation_response(result):
+    """Shape a successful translation service result the way /translate returns short texts."""
+    return {
+        "translated_text": result["translated_text"],
+        "request_id": result["request_id"],
+        "source_language_code": result["source_language_code"]
+    }
 
-        payload = {
-            "input": input_text,
-            "source_language_code": source_lang,
-            "target_language_code": target_lang,
-            "speaker_gender": speaker_gender,
-            "mode": mode,
-            "model": "mayura:v1",
-            "enable_preprocessing": False,
-            "output_script": output_script,
-            "numerals_format": numerals_format
-        }
 
-        headers = {
-            "Content-Type": "application/json",
-            "api-subscription-key": SARVAM_API_KEY
+def long_translation_response(result):
+    """Shape a successful translation service result the way /translate returns chunked texts."""
+    if result["failed_chunks"]:
+        logging.warning(f"{len(result['failed_chunks'])} translation chunk(s) failed and were left untranslated.")
+
+    return {
+        "translated_text": result["translated_text"],
+        "chunked_translation": True,
+        "chunks_count": result["requests_count"] + len(result["failed_chunks"]),
+        "cached_segments": result["cached_segments"],
+        "failed_chunks": result["failed_chunks"]
+    }
+
+
+def perform_translation(input_text, source_lang, target_lang, speaker_gender, mode, output_script, numerals_format):
+    """Translate a short text with Sarvam AI and return the result as a plain dict (Helper for /translate)"""
+    if not SARVAM_API_KEY:
+        return {
+            "error": "SARVAM_API_KEY is not configured on the server. "
+                     "Please set it in a .env file or environment variable before using translation."
         }
 
-        response = requests.post(TRANSLATE_API_URL, json=payload, headers=headers)
-        response_data = response.json()
-        
-        if "translated_text" in response_data:
-            return jsonify({
-                "translated_text": response_data["translated_text"],
-                "request_id": response_data.get("request_id", "unknown"),
-                "source_language_code": response_data.get("source_language_code", "unknown")
-            })
-
-        if request.path != '/translate':
-            return {
-                "error": response_data.get("error", {}).get("message", "Translation failed"),
-                "request_id": response_data.get("error", {}).get("request_id", "unknown"),
-                "details": response_data
-            }
-            
-        return jsonify({
-            "error": response_data.get("error", {}).get("message", "Translation failed"),
-            "request_id": response_data.get("error", {}).get("request_id", "unknown"),
-            "details": response_data
-        }), 500
+    result = translation_service.translate(
+        input_text, source_lang, target_lang, speaker_gender, mode, output_script, numerals_format
+    )
 
-    except requests.exceptions.RequestException as e:
-        if request.path != '/translate':
-            return {"error": "API request failed", "details": str(e)}
-            
-        return jsonify({"error": "API request failed", "details": str(e)}), 500
+    if "translated_text" not in result:
+        return result
+
+    return short_translation_response(result)
 
 
 def translate_long_text(input_text, source_lang, target_lang, speaker_gender, mode, output_script, numerals_format):
-    """Handle translation of texts longer than 1000 characters by splitting into chunks (Helper for /translate)"""
-    sentences = re.split(r'(?<=[.!?])\s+', input_text)
-    chunks = []
-    current_chunk = ""
-    
-    for sentence in sentences:
-        if len(current_chunk) + len(sentence) < 950:
-            current_chunk += sentence + " "
-        else:
-            if current_chunk:
-                chunks.append(current_chunk.strip())
-            current_chunk = sentence + " "
-    
-    if current_chunk:
-        chunks.append(current_chunk.strip())
-    
-    translated_chunks = []
-    is_api_call = request.path == '/translate'
-
-    for chunk in chunks:
-        response = perform_translation(
-            chunk, 
-            source_lang, 
-            target_lang, 
-            speaker_gender, 
-            mode, 
-            output_script, 
-            numerals_format
-        )
-        
-        if is_api_call:
-            response_data = response.get_json()
-            if "translated_text" in response_data:
-                translated_chunks.append(response_data["translated_text"])
-            else:
-                return response
-        else:
-            if "translated_text" in response:
-                translated_chunks.append(response["translated_text"])
-            else:
-                return response
-    
-    full_translation = " ".join(translated_chunks)
-    
-    result_dict = {
-        "translated_text": full_translation,
-        "chunked_translation": True,
-        "chunks_count": len(chunks)
-    }
-    
-    if is_api_call:
-        return jsonify(result_dict)
-    
-    return result_dict
+    """Translate texts longer than 1000 characters and return the result as a plain dict (Helper for /translate)
+
+    The translation service splits the text at sentence boundaries, reuses cached
+    sentences and translates the rest as concurrent requests of under 1000 characters.
+    Chunks that fail are kept untranslated and listed in `failed_chunks`.
+    """
+    if not SARVAM_API_KEY:
+        return {
+            "error": "SARVAM_API_KEY is not configured on the server. "
+                     "Please set it in a .env file or environment variable before using translation."
+        }
+
+    result = translation_service.translate(
+        input_text, source_lang, target_lang, speaker_gender, mode, output_script, numerals_format
+    )
+
+    if "translated_text" not in result:
+        return result
+
+    return long_translation_response(result)
 
 
 @app.route('/translate', methods=['POST'])
@@ -350,7 +785,9 @@ def translate_text():
                          "Please set it in a .env file or environment variable before using translation."
             }), 500
 
-        data = request.json
+        data = read_json()
+        if data is None:
+            return jsonify(INVALID_JSON_RESPONSE), 400
         input_text = data.get("input")
         source_lang = data.get("source_language_code", "").strip()
         target_lang = data.get("target_language_code", "").strip()
@@ -363,96 +800,62 @@ def translate_text():
             return jsonify({"error": "Input text is required"}), 400
 
         if len(input_text) > 1000:
-            return translate_long_text(input_text, source_lang, target_lang, speaker_gender, mode, output_script, numerals_format)
-        
-        return perform_translation(input_text, source_lang, target_lang, speaker_gender, mode, output_script, numerals_format)
+            result = translate_long_text(input_text, source_lang, target_lang, speaker_gender, mode, output_script, numerals_format)
+        else:
+            result = perform_translation(input_text, source_lang, target_lang, speaker_gender, mode, output_script, numerals_format)
+
+        if "translated_text" not in result:
+            return jsonify(result), 500
+
+        return jsonify(result)
 
     except Exception as e:
         return jsonify({"error": "Internal server error", "details": str(e)}), 500
 
 
-# --- REPLACED FUNCTION: Now uses Tesseract (Local, Free) ---
-# --- Corrected and Simplified perform_ocr Function ---
-
-def perform_ocr(file_bytes, file_type):
-    """Perform OCR using Tesseract, handling PDF to image conversion via Poppler."""
-    raw_text = ""
+class UnreadableDocumentError(Exception):
+    """OCR found no usable text in the uploaded document."""
+
+
+def process_document(file_bytes, content_type, target_lang, ocr_mode=DOCUMENT_OCR_MODE, progress=None):
+    """OCR a loan document, explain it with Groq and translate the explanation (Helper for /read-document)
+
+    Returns the /read-document response body. `progress(stage, state)` is called as the
+    "ocr", "explain" and "translate" stages start ("running") and finish ("done",
+    "cached" or "skipped"), which the job API reports while the document is processed.
+    """
+    progress = progress or (lambda stage, state: None)
+    fingerprint = document_cache.fingerprint(file_bytes)
+
+    # --- 1. Perform OCR to extract text (using Tesseract) ---
+    # A document we've already OCR'd in full is served from the cache.
+    progress("ocr", "running")
+    raw_text = document_cache.get(fingerprint, OCR_LAYER)
+    remaining_text = None
+    ocr_cached = raw_text is not None
+    if not ocr_cached:
+        # content_type is the upload's MIME type (e.g., 'application/pdf')
+        with timer("ocr"):
+            raw_text, remaining_text = ocr_until(
+                file_bytes,
+                content_type,
+                DOCUMENT_PROMPT_CHARS,
+                finish_in_background=ocr_mode != "early_exit"
+            )
     
-    # We only check the file_type (MIME type from request). NO document_file.filename check.
-    if 'pdf' in file_type.lower():
-        try:
-            # NOTE: If Poppler is not in the system PATH, you can specify an explicit poppler_path
-            # The path below is a fallback example. Prefer setting the POPPLER_PATH environment variable
-            # to point to your Poppler 'bin' folder (e.g. C:\tools\poppler-xx\Library\bin).
-            poppler_path_default = r'C:\Users\jainj\Downloads\Release-25.07.0-0\poppler-25.07.0\Library\bin'
-
-            # Allow overriding via environment variables so users don't need to edit source.
-            poppler_path_env = os.getenv('POPPLER_PATH') or os.getenv('POPPLER_BIN')
-            poppler_path_win = poppler_path_env or poppler_path_default
-
-            # If the configured path exists, pass it explicitly. Otherwise rely on Poppler being available in PATH.
-            if os.name == 'nt' and os.path.isdir(poppler_path_win):
-                images = convert_from_bytes(file_bytes, poppler_path=poppler_path_win)
-            else:
-                # Try without explicit path; convert_from_bytes will try to use PATH
-                images = convert_from_bytes(file_bytes)
-            
-            for image in images:
-                # Process each page (image) with Tesseract
-                raw_text += pytesseract.image_to_string(image, lang='eng', config='--psm 3') + "\n\n"
-        
-        except Exception as e:
-            # Re-raise the error to include details about the Poppler path failure
-            raise Exception(f"PDF Handling Error: Poppler/PDF2Image failed. Ensure Poppler is installed and poppler_path is set in perform_ocr. Details: {e}")
-            
-    else: # Process as a standard image (PNG, JPEG)
-        try:
-            image = Image.open(BytesIO(file_bytes))
-            raw_text = pytesseract.image_to_string(image, lang='eng', config='--psm 6')
-        
-        except Exception as e:
-            raise Exception(f"Image Reading Error: Pillow/Tesseract failed. Details: {e}")
-
     if not raw_text.strip():
-        raise Exception("OCR failed to extract any text from the document.")
-        
-    return raw_text
-
-
-# NEW: Document Reader Endpoint
-@app.route('/read-document', methods=['POST'])
-def read_document():
-    """Handle document upload, OCR, LLM simplification, and translation/TTS setup."""
-    
-    # NOTE: Check for vision_client initialization REMOVED.
-    
-    if 'document' not in request.files:
-        return jsonify({'error': 'No document file uploaded'}), 400
-
-    document_file = request.files['document']
-    target_lang = request.form.get('language_code', 'en-IN')
-
-    if document_file.filename == '':
-        return jsonify({'error': 'No selected file'}), 400
-
-    if client is None:
-        return jsonify({
-            "error": "GROQ_API_KEY is not configured on the server. "
-                     "Please set it in a .env file or environment variable before using document reader."
-        }), 500
-
-    # Read file content into memory
-    file_bytes = document_file.read()
-    
-    try:
-        # --- 1. Perform OCR to extract text (using Tesseract) ---
-        # document_file.content_type provides the MIME type (e.g., 'application/pdf')
-        raw_text = perform_ocr(file_bytes, document_file.content_type) 
-        
-        if not raw_text.strip():
-            return jsonify({'error': 'Could not extract text from the document. Please ensure the image/PDF is clear.'}), 400
-
-        # --- 2. LLM Simplification (Groq) ---
+        raise UnreadableDocumentError('Could not extract text from the document. Please ensure the image/PDF is clear.')
+    # With background OCR the remaining pages are still being read; the stage is done once they're collected.
+    ocr_pending = remaining_text is not None and not remaining_text.done()
+    if not ocr_pending:
+        progress("ocr", "cached" if ocr_cached else "done")
+
+    # --- 2. LLM Simplification (Groq) ---
+    progress("explain", "running")
+    english_explanation = document_cache.get(fingerprint, EXPLANATION_LAYER)
+    if english_explanation is not None:
+        progress("explain", "cached")
+    else:
         system_prompt_llm = f"""You are an expert financial explainer for first-time loan applicants, working in 'Explain Like I'm 18 Mode'. Your task is to analyze the following loan document text.
         
         **Your output MUST be formatted using standard Markdown syntax (e.g., ## for headings, * for lists, ** for bolding) to ensure clarity.**
@@ -469,51 +872,200 @@ def read_document():
         
         Document Text:
         ---
-        {raw_text[:4000]}
+        {raw_text[:DOCUMENT_PROMPT_CHARS]}
         ---
         """
 
-        chat_completion = client.chat.completions.create(
-            messages=[{"role": "system", "content": system_prompt_llm}],
-            model="llama-3.3-70b-versatile"
-        )
+        with timer("groq_explain"):
+            chat_completion = client.chat.completions.create(
+                messages=[{"role": "system", "content": system_prompt_llm}],
+                model="llama-3.3-70b-versatile"
+            )
 
         english_explanation = chat_completion.choices[0].message.content
         
         if not english_explanation.strip():
             raise Exception("LLM failed to generate an explanation.")
+        document_cache.set(fingerprint, EXPLANATION_LAYER, english_explanation)
+        progress("explain", "done")
 
-        # --- 3. Translate to Target Vernacular Language (Sarvam AI) ---
-        vernacular_explanation = english_explanation
-        if target_lang != "en-IN":
-            translation_result = translate_long_text(
-                english_explanation,
-                source_lang="en-IN",
-                target_lang=target_lang,
-                speaker_gender="Female",
-                mode="formal",
-                output_script="fully-native",
-                numerals_format="international"
-            )
+    # --- 3. Translate to Target Vernacular Language (Sarvam AI) ---
+    vernacular_explanation = english_explanation
+    if target_lang == "en-IN":
+        progress("translate", "skipped")
+    else:
+        progress("translate", "running")
+        cached_translation = document_cache.get(fingerprint, vernacular_layer(target_lang))
+        if cached_translation is not None:
+            vernacular_explanation = cached_translation
+            progress("translate", "cached")
+        else:
+            with timer("translate"):
+                translation_result = translate_long_text(
+                    english_explanation,
+                    source_lang="en-IN",
+                    target_lang=target_lang,
+                    speaker_gender="Female",
+                    mode="formal",
+                    output_script="fully-native",
+                    numerals_format="international"
+                )
             
             if "translated_text" in translation_result:
                 vernacular_explanation = translation_result["translated_text"]
+                # Partially failed translations are not cached, so the next request retries them.
+                if not translation_result["failed_chunks"]:
+                    document_cache.set(fingerprint, vernacular_layer(target_lang), vernacular_explanation)
             else:
                 logging.warning(f"Translation failed for document explanation, using English. Details: {translation_result.get('error')}")
+            progress("translate", "done")
 
 
-        # --- 4. Return the result ---
-        return jsonify({
-            "raw_text": raw_text,
-            "english_explanation": english_explanation,
-            "vernacular_explanation": vernacular_explanation
-        })
+    # --- 4. Collect the pages OCR'd in the background and return the result ---
+    # remaining_text is None only when early exit skipped pages.
+    raw_text_complete = ocr_cached or remaining_text is not None
+    if remaining_text is not None:
+        try:
+            with timer("ocr_remaining"):
+                raw_text += remaining_text.result()
+        except Exception as e:
+            raw_text_complete = False
+            logging.warning(f"OCR of the remaining pages failed, returning partial raw_text. Details: {e}")
+        if ocr_pending:
+            progress("ocr", "done")
+
+    # Only the full text is cached; an early-exit prefix would be wrong for later requests.
+    if raw_text_complete and not ocr_cached:
+        document_cache.set(fingerprint, OCR_LAYER, raw_text)
+
+    return {
+        "raw_text": raw_text,
+        "raw_text_complete": raw_text_complete,
+        "english_explanation": english_explanation,
+        "vernacular_explanation": vernacular_explanation
+    }
+
+
+def read_document_upload():
+    """Validate a /read-document style upload; returns (arguments for process_document, None) or (None, error response)."""
+    if 'document' not in request.files:
+        return None, (jsonify({'error': 'No document file uploaded'}), 400)
+
+    document_file = request.files['document']
+    target_lang = request.form.get('language_code', 'en-IN')
+
+    if document_file.filename == '':
+        return None, (jsonify({'error': 'No selected file'}), 400)
+
+    if client is None:
+        return None, (jsonify({
+            "error": "GROQ_API_KEY is not configured on the server. "
+                     "Please set it in a .env file or environment variable before using document reader."
+        }), 500)
+
+    # "early_exit": skip the pages after the prompt's text entirely (raw_text_complete is false).
+    # "background": stop waiting for OCR once the prompt has enough text and finish the
+    # remaining pages while the LLM runs; this saves no CPU, only latency.
+    ocr_mode = request.form.get('ocr_mode', DOCUMENT_OCR_MODE)
+
+    # Read file content into memory
+    file_bytes = document_file.read()
+    return (file_bytes, document_file.content_type, target_lang, ocr_mode), None
+
+
+# NEW: Document Reader Endpoint
+@app.route('/read-document', methods=['POST'])
+def read_document():
+    """Handle document upload, OCR, LLM simplification, and translation/TTS setup."""
+    
+    # NOTE: Check for vision_client initialization REMOVED.
+    
+    document_args, error_response = read_document_upload()
+    if error_response is not None:
+        return error_response
+
+    try:
+        return jsonify(process_document(*document_args))
+
+    except UnreadableDocumentError as e:
+        return jsonify({'error': str(e)}), 400
 
     except Exception as e:
         logging.error(f"Error in document reader: {str(e)}")
         return jsonify({"error": f"Failed to process document: {str(e)}"}), 500
 
 
+@app.route('/documents/jobs', methods=['POST'])
+def submit_document_job():
+    """Queue a /read-document job and return its id right away (202).
+
+    Takes the same form fields as /read-document. Poll GET /documents/jobs/<job_id>
+    for per-stage progress and fetch GET /documents/jobs/<job_id>/result once done.
+    """
+    document_args, error_response = read_document_upload()
+    if error_response is not None:
+        return error_response
+
+    try:
+        job_id = document_jobs.submit(process_document, *document_args)
+    except QueueFull:
+        response = jsonify({"error": "Too many documents are being processed. Please retry shortly."})
+        response.headers["Retry-After"] = "5"
+        return response, 429
+
+    response = jsonify({
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": f"/documents/jobs/{job_id}",
+        "result_url": f"/documents/jobs/{job_id}/result"
+    })
+    response.headers["Location"] = f"/documents/jobs/{job_id}"
+    return response, 202
+
+
+@app.route('/documents/jobs/<job_id>', methods=['GET'])
+def document_job_status(job_id):
+    """Report a document job's status and the state of its ocr/explain/translate stages."""
+    job = document_jobs.status(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job id"}), 404
+    return jsonify(job)
+
+
+@app.route('/documents/jobs/<job_id>/result', methods=['GET'])
+def document_job_result(job_id):
+    """Return the /read-document body of a finished job (202 while it is still running)."""
+    job = document_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job id"}), 404
+
+    if job["status"] == "done":
+        return jsonify(job["result"])
+
+    if job["status"] == "failed":
+        return jsonify({"error": f"Failed to process document: {job['error']}"}), 500
+
+    return jsonify({"job_id": job_id, "status": job["status"], "stages": job["stages"]}), 202
+
+
+def preprocess_stt_upload(audio_bytes, filename):
+    """Normalize an STT upload; returns (audio bytes, filename), or (None, None) if it has no speech.
+
+    Uploads that can't be decoded are passed on unchanged for Sarvam to deal with.
+    """
+    try:
+        with timer("stt_preprocess"):
+            prepared = prepare_stt_audio(audio_bytes)
+    except AudioDecodeError as e:
+        logging.warning(f"Couldn't decode {filename} for STT preprocessing ({e}); sending it as uploaded.")
+        return audio_bytes, filename
+
+    if prepared is None:
+        return None, None
+    print(f"🎚️ STT audio: {prepared['duration']}s of speech, {prepared['trimmed']}s of silence trimmed")
+    return prepared["audio"], "audio.wav"
+
+
 @app.route('/speech-to-text', methods=['POST'])
 def speech_to_text():
     """Convert Speech to Text using Sarvam AI"""
@@ -531,15 +1083,11 @@ def speech_to_text():
     if audio_file.filename == '':
         return jsonify({'error': 'No selected file'}), 400
 
-    # Save temporarily
-    filename = secure_filename(audio_file.filename)
-    file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+    # The upload is still in memory (or a private temp file if it's very large); post it as is.
+    filename = secure_filename(audio_file.filename) or "audio.wav"
 
     try:
-        audio_file.save(file_path)
-
-        if os.stat(file_path).st_size == 0:
-            os.remove(file_path)
+        if upload_size(audio_file) == 0:
             return jsonify({'error': 'Uploaded file is empty'}), 400
 
         global lang
@@ -547,37 +1095,42 @@ def speech_to_text():
 
         print("🔊 STT Language:", current_lang)
 
-        with open(file_path, 'rb') as f:
-            files = {
-                'file': (filename, f, 'audio/wav')
-            }
-
-            data = {
-                'model': 'saarika:v2.5',
-                'language_code': current_lang
-            }
-
-            headers = {
-                'api-subscription-key': SARVAM_API_KEY
-            }
-
-            response = requests.post(
-                'https://api.sarvam.ai/speech-to-text',
-                headers=headers,
-                data=data,
-                files=files
-            )
+        audio = audio_file.stream
+        if STT_PREPROCESS:
+            audio, filename = preprocess_stt_upload(audio_file.stream.read(), filename)
+            if audio is None:
+                return jsonify({'error': 'No speech detected in the recording'}), 400
+
+        files = {
+            'file': (filename, audio, 'audio/wav')
+        }
+
+        data = {
+            'model': 'saarika:v2.5',
+            'language_code': current_lang
+        }
 
-            # 🔥 SHOW REAL ERROR IF 400
-            if response.status_code != 200:
-                print("❌ Sarvam Error:", response.text)
-                return jsonify({
-                    "error": "Sarvam STT failed",
-                    "details": response.text
-                }), 500
+        headers = {
+            'api-subscription-key': SARVAM_API_KEY
+        }
 
-            result = response.json()
-            print("✅ STT Response:", result)
+        response = sarvam_http.post(
+            STT_API_URL,
+            headers=headers,
+            data=data,
+            files=files
+        )
+
+        # 🔥 SHOW REAL ERROR IF 400
+        if response.status_code != 200:
+            print("❌ Sarvam Error:", response.text)
+            return jsonify({
+                "error": "Sarvam STT failed",
+                "details": response.text
+            }), 500
+
+        result = response.json()
+        print("✅ STT Response:", result)
 
         transcription = result.get('transcript')
 
@@ -594,11 +1147,65 @@ def speech_to_text():
         return jsonify({'error': 'Internal server error'}), 500
 
     finally:
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        audio_file.close()
+
 
 
 
+def build_tts_request(chunk, target_lang, config):
+    """Build the Sarvam TTS request body for one chunk of text."""
+    request_body = {
+        "inputs": [chunk],
+        "target_language_code": target_lang,
+        "speaker": config["speaker"],
+        "pitch": 0,
+        "pace": 1.0,
+        "loudness": 1.0,
+        "speech_sample_rate": TTS_SAMPLE_RATE,
+        "enable_preprocessing": True,
+        "model": config["model"]
+    }
+    if target_lang == "en-IN":
+        request_body["eng_interpolation_wt"] = 123
+    return request_body
+
+
+def decode_tts_response(response):
+    """Return the decoded audio from a Sarvam TTS response, or None if it failed."""
+    if response.status_code != 200:
+        logging.error(f"TTS API error for chunk: {response.text}")
+        return None
+
+    result = response.json()
+    if "audios" in result and result["audios"]:
+        return base64.b64decode(result["audios"][0])
+    return None
+
+
+@timer("tts_chunk")
+def synthesize_tts_chunk(chunk, target_lang, config):
+    """Synthesize one chunk of text with Sarvam TTS and return the decoded audio (None on API error).
+
+    Audio for an identical request is served from `tts_cache` without calling Sarvam.
+    """
+    request_body = build_tts_request(chunk, target_lang, config)
+
+    cache_key = tts_cache.key_for(request_body)
+    cached_audio = tts_cache.get(cache_key)
+    if cached_audio is not None:
+        return cached_audio
+
+    headers = {
+        "api-subscription-key": SARVAM_API_KEY,
+        "Content-Type": "application/json"
+    }
+
+    response = sarvam_http.post(TTS_API_URL, headers=headers, json=request_body)
+    audio = decode_tts_response(response)
+    if audio is not None:
+        tts_cache.set(cache_key, audio)
+    return audio
+
 
 @app.route('/text-to-speech', methods=['POST'])
 def text_to_speech():
@@ -610,7 +1217,9 @@ def text_to_speech():
                          "Please set it in a .env file or environment variable before using text-to-speech."
             }), 500
 
-        data = request.json
+        data = read_json()
+        if data is None:
+            return jsonify(INVALID_JSON_RESPONSE), 400
         text_list = data.get("inputs", [])
         if not text_list or not isinstance(text_list, list) or not text_list[0].strip():
             return jsonify({"error": "Text is required"}), 400
@@ -621,97 +1230,62 @@ def text_to_speech():
         # Ensure 'lang' global variable is the source if not specified in the request
         source_lang = data.get("source_language_code", lang)
 
-        # --- UPDATED CONFIGURATION FOR VALID SARVAM SPEAKERS/MODELS ---
-        # NOTE: For model 'bulbul:v2' the allowed speakers (per Sarvam docs)
-        # are: 'anushka', 'abhilash', 'manisha', 'vidya', 'arya', 'karun', 'hitesh'.
-        # To avoid validation errors, we only use this set below.
-        LANGUAGE_CONFIG = {
-            'en-IN': {"model": "bulbul:v2", "chunk_size": 500, "silence_bytes": 2000, "speaker": "anushka"},
-            'hi-IN': {"model": "bulbul:v2", "chunk_size": 300, "silence_bytes": 3000, "speaker": "abhilash"},
-            'ta-IN': {"model": "bulbul:v2", "chunk_size": 300, "silence_bytes": 3000, "speaker": "vidya"},
-            'te-IN': {"model": "bulbul:v2", "chunk_size": 300, "silence_bytes": 3000, "speaker": "karun"},
-            'kn-IN': {"model": "bulbul:v2", "chunk_size": 300, "silence_bytes": 3000, "speaker": "hitesh"},
-            'ml-IN': {"model": "bulbul:v2", "chunk_size": 300, "silence_bytes": 3000, "speaker": "arya"},
-            'mr-IN': {"model": "bulbul:v2", "chunk_size": 300, "silence_bytes": 3000, "speaker": "manisha"},
-            'bn-IN': {"model": "bulbul:v2", "chunk_size": 300, "silence_bytes": 3000, "speaker": "anushka"},
-            'gu-IN': {"model": "bulbul:v2", "chunk_size": 300, "silence_bytes": 3000, "speaker": "karun"},
-            'pa-IN': {"model": "bulbul:v2", "chunk_size": 300, "silence_bytes": 3000, "speaker": "hitesh"}
-        }
-
         config = LANGUAGE_CONFIG.get(currLang, LANGUAGE_CONFIG['en-IN'])
-        model = config["model"]
         chunk_size = config["chunk_size"]
-        silence_bytes = config["silence_bytes"]
-        speaker = config["speaker"]
 
         # 1. Translate text if source and target languages differ
         if source_lang != currLang:
-            translate_payload = {
-                "input": text,
-                "source_language_code": source_lang,
-                "target_language_code": currLang,
-                "speaker_gender": "Female",
-                "mode": "formal",
-                "model": "bulbul:v1"
-            }
-            translate_headers = {
-                "Content-Type": "application/json",
-                "api-subscription-key": SARVAM_API_KEY
-            }
             try:
-                translate_response = requests.post(TRANSLATE_API_URL, json=translate_payload, headers=translate_headers)
-                if translate_response.status_code == 200:
-                    translate_result = translate_response.json()
-                    text = translate_result.get("translated_text", text)
+                with timer("translate"):
+                    translate_result = translation_service.translate(text, source_lang, currLang)
+                if "translated_text" in translate_result:
+                    text = translate_result["translated_text"]
                 else:
-                    logging.warning(f"Translation failed for TTS with status {translate_response.status_code}")
+                    logging.warning(f"Translation failed for TTS: {translate_result.get('error')}")
             except Exception as e:
                 logging.error(f"Translation error in TTS: {str(e)}")
                 # Continue with original text if translation fails
 
-        # 2. Process text in chunks for TTS
-        audio_data_combined = BytesIO()
-        silence_chunk = b"\x00" * silence_bytes
-        text_chunks = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
-
-        for chunk in text_chunks:
-            if not chunk.strip():
-                continue
-
-            request_body = {
-                "inputs": [chunk],
-                "target_language_code": currLang,
-                "speaker": speaker,
-                "pitch": 0,
-                "pace": 1.0,
-                "loudness": 1.0,
-                "speech_sample_rate": 22050,
-                "enable_preprocessing": True,
-                "model": model
-            }
-            if currLang == "en-IN":
-                request_body["eng_interpolation_wt"] = 123
-
-            headers = {
-                "api-subscription-key": SARVAM_API_KEY,
-                "Content-Type": "application/json"
-            }
-
-            response = requests.post("https://api.sarvam.ai/text-to-speech", headers=headers, json=request_body)
-            if response.status_code != 200:
-                logging.error(f"TTS API error for chunk: {response.text}")
-                continue
-
-            result = response.json()
-            if "audios" in result and result["audios"]:
-                audio_data_combined.write(base64.b64decode(result["audios"][0]))
-                audio_data_combined.write(silence_chunk)
-
-        if audio_data_combined.getbuffer().nbytes <= silence_bytes:
+        # 2. Process text in sentence-aligned chunks for TTS (chunks are synthesized in parallel)
+        text_chunks = split_tts_text(text, chunk_size)
+
+        chunk_audios = iter_synthesized_chunks(
+            text_chunks,
+            lambda chunk: synthesize_tts_chunk(chunk, currLang, config),
+            max_concurrency=TTS_MAX_CONCURRENCY
+        )
+
+        # Streaming mode: send each chunk's audio as soon as it (and every chunk before it) is ready
+        if data.get("stream"):
+            # Wait for the first usable chunk so a total failure can still be reported as JSON.
+            first_audio = None
+            try:
+                first_audio = next((audio for audio in chunk_audios if audio is not None), None)
+            finally:
+                if first_audio is None:
+                    # Nothing will stream; release the worker pool and any chunks still in flight.
+                    chunk_audios.close()
+            if first_audio is None:
+                return jsonify({"error": "Failed to generate audio"}), 500
+
+            def generate_audio():
+                try:
+                    yield from stream_wav(
+                        itertools.chain([first_audio], chunk_audios), TTS_AUDIO_FORMAT, config["silence_ms"]
+                    )
+                except requests.exceptions.RequestException as e:
+                    logging.error(f"TTS API request failed mid-stream: {str(e)}")
+                finally:
+                    chunk_audios.close()
+
+            return Response(generate_audio(), mimetype="audio/wav")
+
+        # One WAV header for the whole answer, with real silence frames between the chunks
+        audio_data_combined = assemble_wav(chunk_audios, TTS_AUDIO_FORMAT, config["silence_ms"])
+        if audio_data_combined is None:
             return jsonify({"error": "Failed to generate audio"}), 500
 
-        audio_data_combined.seek(0)
-        return send_file(audio_data_combined, mimetype="audio/mpeg")
+        return Response(audio_data_combined, mimetype="audio/wav")
 
     except requests.exceptions.RequestException as e:
         logging.error(f"TTS API request failed: {str(e)}")
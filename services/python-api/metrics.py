@@ -0,0 +1,177 @@
+"""Lightweight latency/error instrumentation with a Prometheus text exporter.
+
+`timer("ocr")` times a block (or, as a decorator, a function) into the
+`stage_duration_seconds{stage="ocr"}` histogram, and counts it in
+`stage_errors_total` if it raises. While a request is being handled its timed
+stages are also collected for that request, so they can be returned as a
+`Server-Timing` header. Counters and histograms live in this
+process; with several gunicorn workers each worker exports its own.
+"""
+import contextvars
+import functools
+import threading
+import time
+
+# Latency buckets in seconds, from a cache hit up to a long PDF.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# The stages timed during the current request, as (stage, seconds) pairs.
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += value
+
+
+class MetricsRegistry:
+    """Counters and histograms keyed by metric name and label values."""
+
+    def __init__(self):
+        self._counters = {}
+        self._histograms = {}
+        self._help = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def describe(self, name, kind, help_text):
+        self._help[name] = (kind, help_text)
+
+    def inc(self, name, amount=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    @staticmethod
+    def _format_labels(labels, extra=()):
+        pairs = list(labels) + list(extra)
+        if not pairs:
+            return ""
+        escaped = (
+            (key, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+            for key, value in pairs
+        )
+        return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        described = set()
+
+        def header(name, default_kind):
+            if name in described:
+                return
+            described.add(name)
+            kind, help_text = self._help.get(name, (default_kind, None))
+            if help_text:
+                lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            for (name, labels), value in sorted(self._counters.items()):
+                header(name, "counter")
+                lines.append(f"{name}{self._format_labels(labels)} {value}")
+
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                header(name, "histogram")
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{self._format_labels(labels, [('le', bound)])} {cumulative}")
+                lines.append(f"{name}_bucket{self._format_labels(labels, [('le', '+Inf')])} {histogram.count}")
+                lines.append(f"{name}_sum{self._format_labels(labels)} {histogram.sum:.6f}")
+                lines.append(f"{name}_count{self._format_labels(labels)} {histogram.count}")
+
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+registry.describe("http_request_duration_seconds", "histogram", "Time to handle a request, per endpoint.")
+registry.describe("stage_duration_seconds", "histogram", "Time spent in each processing stage or upstream call.")
+registry.describe("stage_errors_total", "counter", "Stages or upstream calls (including Groq) that raised.")
+registry.describe("upstream_request_duration_seconds", "histogram", "Time per upstream HTTP attempt.")
+registry.describe("upstream_requests_total", "counter", "Upstream HTTP attempts by outcome.")
+registry.describe("upstream_retries_total", "counter", "Upstream HTTP attempts that were retried.")
+registry.describe("upstream_errors_total", "counter", "Upstream calls that failed after retries, by kind.")
+registry.describe("chat_routed_total", "counter", "Chat messages answered locally instead of by Groq, by intent.")
+
+
+class Timer:
+    """Times a `with` block, or every call of a decorated function, as `stage`."""
+
+    def __init__(self, stage, metric="stage_duration_seconds", **labels):
+        self.stage = stage
+        self.metric = metric
+        self.labels = labels
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        elapsed = time.perf_counter() - self.start
+        registry.observe(self.metric, elapsed, stage=self.stage, **self.labels)
+        if exc_type is not None:
+            registry.inc("stage_errors_total", stage=self.stage, error=exc_type.__name__)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((self.stage, elapsed))
+        return False
+
+    def __call__(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with Timer(self.stage, self.metric, **self.labels):
+                return func(*args, **kwargs)
+        return wrapper
+
+
+def timer(stage, **labels):
+    return Timer(stage, **labels)
+
+
+def start_request_timings():
+    """Start collecting the stages timed for the current request."""
+    return _request_timings.set([])
+
+
+def request_timings():
+    return _request_timings.get() or []
+
+
+def server_timing_header(timings):
+    """Format (stage, seconds) pairs as a Server-Timing header, adding up repeated stages.
+
+    Stages timed concurrently (e.g. parallel TTS chunks) can add up to more than the request took.
+    """
+    totals = {}
+    for stage, seconds in timings:
+        total, count = totals.get(stage, (0.0, 0))
+        totals[stage] = (total + seconds, count + 1)
+    return ", ".join(
+        f'{stage};dur={total * 1000:.1f}' + (f';desc="x{count}"' if count > 1 else "")
+        for stage, (total, count) in totals.items()
+    )
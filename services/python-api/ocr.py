@@ -0,0 +1,214 @@
+"""Tesseract OCR for uploaded documents.
+
+PDF pages are OCR'd in parallel on a process pool sized to the machine's cores.
+Each task covers a small page range and renders its pages one at a time, so a
+long PDF never has all of its page bitmaps in memory at once. Every page is
+cleaned up (see ocr_preprocess.py) before it reaches Tesseract, and blank
+pages are skipped.
+"""
+import logging
+import multiprocessing
+import os
+import tempfile
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
+from io import BytesIO
+
+import pytesseract
+from dotenv import load_dotenv
+from pdf2image import convert_from_path, pdfinfo_from_path
+from PIL import Image
+
+from ocr_preprocess import image_dpi, preprocess_for_ocr
+
+# Also loaded here because OCR worker processes don't import main.py.
+load_dotenv()
+
+# --- TESSERACT PATH CONFIG (WINDOWS-FRIENDLY) ---
+# Prefer an environment variable so you don't have to edit code:
+#   TESSERACT_PATH=C:\Program Files\Tesseract-OCR\tesseract.exe
+# This runs on import, so OCR worker processes pick it up too.
+TESSERACT_PATH = os.getenv("TESSERACT_PATH", r"C:\Program Files\Tesseract-OCR\tesseract.exe")
+if os.name == "nt":
+    if os.path.exists(TESSERACT_PATH):
+        pytesseract.pytesseract.tesseract_cmd = TESSERACT_PATH
+        logging.info(f"Using Tesseract at: {TESSERACT_PATH}")
+    else:
+        logging.warning(
+            "Tesseract not found at default path. "
+            "Set TESSERACT_PATH env var to your Tesseract executable or add it to PATH."
+        )
+
+# NOTE: If Poppler is not in the system PATH, you can specify an explicit poppler_path.
+# The path below is a fallback example. Prefer setting the POPPLER_PATH environment variable
+# to point to your Poppler 'bin' folder (e.g. C:\tools\poppler-xx\Library\bin).
+POPPLER_PATH_DEFAULT = r'C:\Users\jainj\Downloads\Release-25.07.0-0\poppler-25.07.0\Library\bin'
+
+# Default to the cores this process may actually run on (respects container CPU pinning).
+AVAILABLE_CORES = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(AVAILABLE_CORES)))
+OCR_PAGES_PER_TASK = int(os.getenv("OCR_PAGES_PER_TASK", "2"))
+# PDF pages are rendered at pdf2image's usual 200 DPI; raise OCR_PDF_DPI for documents with very small print.
+OCR_PDF_DPI = int(os.getenv("OCR_PDF_DPI", "200"))
+# Set OCR_PREPROCESS=0 to hand Tesseract the original images.
+OCR_PREPROCESS = os.getenv("OCR_PREPROCESS", "1") != "0"
+
+_pool = None
+# Drives the OCR of pages left over after an early exit (see ocr_until).
+_background = ThreadPoolExecutor(max_workers=int(os.getenv("OCR_BACKGROUND_THREADS", "4")), thread_name_prefix="ocr")
+
+
+def poppler_kwargs():
+    """Pass an explicit poppler_path on Windows when one is configured; otherwise rely on PATH."""
+    poppler_path_win = os.getenv('POPPLER_PATH') or os.getenv('POPPLER_BIN') or POPPLER_PATH_DEFAULT
+    if os.name == 'nt' and os.path.isdir(poppler_path_win):
+        return {"poppler_path": poppler_path_win}
+    return {}
+
+
+def get_pool():
+    """Process pool shared by all requests in this worker, created on first use."""
+    global _pool
+    if _pool is None:
+        # "spawn" avoids forking a multi-threaded web server process.
+        _pool = ProcessPoolExecutor(max_workers=OCR_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def ocr_image(image, psm, dpi=None):
+    """OCR one page image with the given Tesseract page segmentation mode ("" for a blank page)."""
+    if OCR_PREPROCESS:
+        image = preprocess_for_ocr(image, dpi)
+        if image is None:
+            return ""
+    return pytesseract.image_to_string(image, lang='eng', config=f'--psm {psm}')
+
+
+def ocr_pdf_pages(pdf_path, first_page, last_page):
+    """OCR pages first_page..last_page of a PDF file, rendering one page at a time."""
+    texts = []
+    for page in range(first_page, last_page + 1):
+        images = convert_from_path(
+            pdf_path,
+            dpi=OCR_PDF_DPI,
+            first_page=page,
+            last_page=page,
+            grayscale=OCR_PREPROCESS,
+            **poppler_kwargs()
+        )
+        for image in images:
+            texts.append(ocr_image(image, psm=3, dpi=OCR_PDF_DPI))
+            image.close()
+    return texts
+
+
+def page_ranges(page_count, pages_per_task):
+    return [
+        (first, min(first + pages_per_task - 1, page_count))
+        for first in range(1, page_count + 1, pages_per_task)
+    ]
+
+
+def iter_ocr_pdf(file_bytes):
+    """Yield the OCR text of each PDF page, in page order, as soon as it is ready.
+
+    Only about `OCR_WORKERS` page ranges are queued ahead of the consumer, so if
+    the consumer stops early the remaining pages are never rendered or OCR'd.
+    """
+    # Workers read the PDF from a temp file rather than each receiving a copy of the bytes.
+    # (pdf2image's convert_from_bytes writes one internally anyway.)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pdf_path = os.path.join(tmp_dir, "document.pdf")
+        with open(pdf_path, 'wb') as f:
+            f.write(file_bytes)
+
+        page_count = pdfinfo_from_path(pdf_path, **poppler_kwargs())["Pages"]
+        ranges = page_ranges(page_count, OCR_PAGES_PER_TASK)
+        if len(ranges) == 1 or OCR_WORKERS <= 1:
+            for page in range(1, page_count + 1):
+                yield from ocr_pdf_pages(pdf_path, page, page)
+            return
+
+        pool = get_pool()
+        pending = deque()
+        next_range = iter(ranges)
+        try:
+            for first, last in islice(next_range, OCR_WORKERS):
+                pending.append(pool.submit(ocr_pdf_pages, pdf_path, first, last))
+            while pending:
+                texts = pending.popleft().result()
+                for first, last in islice(next_range, 1):
+                    pending.append(pool.submit(ocr_pdf_pages, pdf_path, first, last))
+                yield from texts
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def iter_ocr_pages(file_bytes, file_type):
+    """Yield the document's OCR text page by page (a single piece for images).
+
+    Errors are raised with the same messages `perform_ocr` has always used.
+    """
+    # We only check the file_type (MIME type from request). NO document_file.filename check.
+    if 'pdf' in file_type.lower():
+        try:
+            for page_text in iter_ocr_pdf(file_bytes):
+                # Blank pages are skipped rather than adding empty paragraphs.
+                if page_text:
+                    yield page_text + "\n\n"
+
+        except Exception as e:
+            # Re-raise the error to include details about the Poppler path failure
+            raise Exception(f"PDF Handling Error: Poppler/PDF2Image failed. Ensure Poppler is installed and POPPLER_PATH is set. Details: {e}")
+
+    else: # Process as a standard image (PNG, JPEG)
+        try:
+            image = Image.open(BytesIO(file_bytes))
+            text = ocr_image(image, psm=6, dpi=image_dpi(image))
+
+        except Exception as e:
+            raise Exception(f"Image Reading Error: Pillow/Tesseract failed. Details: {e}")
+
+        yield text
+
+
+def perform_ocr(file_bytes, file_type):
+    """Perform OCR using Tesseract, handling PDF to image conversion via Poppler."""
+    raw_text = "".join(iter_ocr_pages(file_bytes, file_type))
+
+    if not raw_text.strip():
+        raise Exception("OCR failed to extract any text from the document.")
+
+    return raw_text
+
+
+def ocr_until(file_bytes, file_type, budget, measure=len, finish_in_background=False):
+    """OCR pages only until `measure(text) >= budget` (e.g. enough characters for a prompt).
+
+    Returns (text, rest). With `finish_in_background`, `rest` is a Future that
+    resolves to the text of the remaining pages, which keep being OCR'd while
+    the caller carries on; otherwise the remaining pages are skipped and `rest`
+    is None. When the whole document fit in the budget, `rest` is an already
+    completed Future of "" in both modes, so None always means incomplete text.
+    """
+    pages = iter_ocr_pages(file_bytes, file_type)
+    text = ""
+    for page_text in pages:
+        text += page_text
+        if measure(text) >= budget:
+            break
+    else:
+        pages.close()
+        if not text.strip():
+            raise Exception("OCR failed to extract any text from the document.")
+        done = Future()
+        done.set_result("")
+        return text, done
+
+    if not finish_in_background:
+        pages.close()
+        return text, None
+
+    return text, _background.submit(lambda: "".join(pages))
@@ -0,0 +1,48 @@
+"""Sentence boundaries shared by translation, TTS chunking and the streamed chat reply.
+
+A sentence ends at . ! ? or the danda (with any closing quotes or brackets),
+followed by whitespace or the end of the text. A full stop after a common
+abbreviation ("Rs. 10,000", "8.5% p.a. for", "Dr. Rao", "e.g. a car loan")
+or a single initial doesn't end the sentence, so loan text isn't cut into
+half-sentences.
+"""
+import re
+
+SENTENCE_END = re.compile(r'[.!?।॥]+["\'”’)\]]*(?=\s|$)')
+# Matched case-insensitively against the word before the full stop, without that stop.
+ABBREVIATIONS = {
+    "rs", "inr", "re", "p.a", "pa", "approx", "no", "nos", "sr", "jr", "dr", "mr", "mrs", "ms", "prof", "st",
+    "e.g", "eg", "i.e", "ie", "vs", "viz", "a/c", "pvt", "ltd", "co", "govt", "dept", "max", "min"
+}
+PRECEDING_WORD = re.compile(r'[A-Za-z][A-Za-z./]*$')
+
+
+def is_abbreviation(text, match):
+    """Whether a SENTENCE_END `match` in `text` is the full stop of an abbreviation."""
+    if match.group().rstrip('"\'”’)]') != ".":
+        return False
+    word = PRECEDING_WORD.search(text, 0, match.start())
+    if word is None:
+        return False
+    word = word.group().lower()
+    return word in ABBREVIATIONS or len(word) == 1
+
+
+def sentence_ends(text):
+    """Offsets just past the punctuation of each sentence end in `text`."""
+    return [match.end() for match in SENTENCE_END.finditer(text) if not is_abbreviation(text, match)]
+
+
+def split_sentences(text):
+    """Split `text` after each sentence end; the pieces concatenate back to `text`.
+
+    Each piece after the first starts with the whitespace that followed the
+    previous sentence.
+    """
+    pieces = []
+    start = 0
+    for end in sentence_ends(text):
+        pieces.append(text[start:end])
+        start = end
+    pieces.append(text[start:])
+    return [piece for piece in pieces if piece]
@@ -0,0 +1,117 @@
+"""Conversation session stores for /chat.
+
+`MemorySessionStore` keeps sessions in-process with LRU + idle-TTL eviction and a
+memory cap. `SQLiteSessionStore` keeps them in a SQLite file, so every gunicorn
+worker (or process) on the host sees the same history and it survives restarts;
+with path=":memory:" it doubles as a local stand-in for tests.
+"""
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+from cache import LRUCache
+
+# Rough per-message overhead (dict, role string) on top of the content itself.
+MESSAGE_OVERHEAD_BYTES = 100
+
+
+def trim_by_count(messages, max_messages=8, keep_last=6):
+    """Keep the system prompt plus the last `keep_last` messages once there are more than `max_messages`."""
+    # 🔥 Keep conversation short to prevent token overflow
+    if len(messages) > max_messages:
+        return [messages[0]] + messages[-keep_last:]
+    return messages
+
+
+def messages_size(messages):
+    return sum(len(message["content"].encode("utf-8")) + MESSAGE_OVERHEAD_BYTES for message in messages)
+
+
+class MemorySessionStore:
+    """In-process store: least recently used sessions are evicted past `max_bytes`,
+    and sessions idle for longer than `idle_ttl` seconds expire. A single session
+    bigger than `max_bytes` loses its oldest messages until it fits."""
+
+    def __init__(self, max_bytes, idle_ttl, trim=trim_by_count):
+        self.trim = trim
+        self.max_bytes = max_bytes
+        self._sessions = LRUCache(max_bytes, ttl=idle_ttl, sizeof=messages_size)
+
+    def load(self, session_id):
+        """Return a copy of the session's messages ([] for a new or expired session)."""
+        messages = self._sessions.get(session_id)
+        return [dict(message) for message in messages] if messages else []
+
+    def save(self, session_id, messages):
+        messages = self.trim(messages)
+        if messages_size(messages) > self.max_bytes:
+            # The cache would silently refuse it (and keep the stale copy), so drop the
+            # oldest turns after the system prompt until it fits.
+            dropped = 0
+            while len(messages) > 1 and messages_size(messages) > self.max_bytes:
+                messages = [messages[0]] + messages[2:]
+                dropped += 1
+            if messages_size(messages) > self.max_bytes:
+                dropped += len(messages)
+                messages = []
+            logging.warning(f"Session {session_id} is over the {self.max_bytes}-byte session limit; "
+                            f"dropped its {dropped} oldest message(s).")
+        self._sessions.set(session_id, messages)
+
+    def stats(self):
+        return dict(self._sessions.stats(), backend="memory")
+
+
+class SQLiteSessionStore:
+    """Store shared by every process that opens the same SQLite file."""
+
+    def __init__(self, path, idle_ttl, max_sessions=10000, trim=trim_by_count):
+        self.trim = trim
+        self.idle_ttl = idle_ttl
+        self.max_sessions = max_sessions
+        self.writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, messages TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS sessions_updated_at ON sessions (updated_at)")
+
+    def load(self, session_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT messages FROM sessions WHERE session_id = ? AND updated_at > ?",
+                (session_id, time.time() - self.idle_ttl)
+            ).fetchone()
+        return json.loads(row[0]) if row else []
+
+    def save(self, session_id, messages):
+        payload = json.dumps(self.trim(messages), ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO sessions (session_id, messages, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET messages = excluded.messages, updated_at = excluded.updated_at",
+                (session_id, payload, time.time())
+            )
+            self.writes += 1
+            # Sweep expired and excess sessions every so often rather than on every write.
+            if self.writes % 100 == 1:
+                self._evict()
+
+    def _evict(self):
+        self._conn.execute("DELETE FROM sessions WHERE updated_at <= ?", (time.time() - self.idle_ttl,))
+        self._conn.execute(
+            "DELETE FROM sessions WHERE session_id IN ("
+            "SELECT session_id FROM sessions ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_sessions,)
+        )
+
+    def stats(self):
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        return {"backend": "sqlite", "entries": count, "max_sessions": self.max_sessions}
@@ -0,0 +1,28 @@
+"""Upload handling that keeps normal-sized files off the disk.
+
+Werkzeug writes every uploaded file over 500 KB to a temporary file. With
+`SpooledRequest` as the app's request class each uploaded file is buffered in a
+SpooledTemporaryFile instead, which stays in memory until it grows past
+`spool_max_bytes` and only then rolls over to an anonymous temp file that is
+unique to the request and removed when it's closed.
+"""
+import os
+import tempfile
+
+from flask import Request
+
+
+class SpooledRequest(Request):
+    spool_max_bytes = 2 * 1024 * 1024
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.SpooledTemporaryFile(max_size=self.spool_max_bytes)
+
+
+def upload_size(file_storage):
+    """Size in bytes of an uploaded file, leaving its stream at the start."""
+    stream = file_storage.stream
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(0)
+    return size
@@ -0,0 +1,58 @@
+import json
+import unittest
+
+from chat_stream import SpokenTextExtractor
+
+
+def stream(extractor, reply, step=3):
+    """Feed `reply` to `extractor` a few characters at a time, like Groq does.
+
+    Returns (sentences, offset) pairs: each sentence and how far into the reply
+    the stream was when it came out.
+    """
+    out = []
+    for offset in range(0, len(reply), step):
+        for sentence in extractor.feed(reply[offset:offset + step]):
+            out.append((sentence, offset + step))
+    for sentence in extractor.finish():
+        out.append((sentence, len(reply)))
+    return out
+
+
+class SpokenTextExtractorTest(unittest.TestCase):
+    def test_abbreviations_do_not_end_a_sentence(self):
+        reply = json.dumps({
+            "spoken_text": "Your EMI is Rs. 8,997 per month at 8.5% p.a. for 20 years. Dr. Rao can help, e.g. with papers. Thanks!",
+            "full_text": "Details."
+        })
+        sentences = [sentence for sentence, _ in stream(SpokenTextExtractor(), reply)]
+        self.assertEqual(sentences, [
+            "Your EMI is Rs. 8,997 per month at 8.5% p.a. for 20 years.",
+            "Dr. Rao can help, e.g. with papers.",
+            "Thanks!"
+        ])
+
+    def test_last_sentence_comes_out_when_spoken_text_closes(self):
+        reply = json.dumps({
+            "spoken_text": "Your EMI is Rs. 8,997 per month. Total interest is high.",
+            "full_text": "A long explanation that keeps streaming. " * 20
+        })
+        closed_at = reply.index('", "full_text"') + 1
+        out = stream(SpokenTextExtractor(), reply)
+
+        self.assertEqual([sentence for sentence, _ in out],
+                         ["Your EMI is Rs. 8,997 per month.", "Total interest is high."])
+        last_sentence, offset = out[-1]
+        self.assertLess(offset, len(reply))
+        self.assertLessEqual(offset - closed_at, 3)
+        self.assertGreaterEqual(offset, closed_at)
+
+    def test_nothing_left_for_finish_after_the_field_closes(self):
+        extractor = SpokenTextExtractor()
+        self.assertEqual(extractor.feed('{"spoken_text": "Done"'), ["Done"])
+        self.assertEqual(extractor.feed(', "full_text": "More. Text."}'), [])
+        self.assertEqual(extractor.finish(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,292 @@
+"""Sarvam translation service with a chunk-level memo cache.
+
+Text is split into segments (sentences and lines) at real sentence boundaries,
+and consecutive segments are packed into chunks of up to `max_chars`, which are
+translated one request each, with their sentences kept together so the model
+sees them in context. Chunk boundaries depend only on the text, and each
+chunk's translation is cached, so repeated text (the same explanation read
+again, or a document whose opening pages are unchanged) isn't sent twice.
+"""
+import asyncio
+import contextvars
+import hashlib
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from cache import LRUCache
+from sentences import split_sentences
+
+# Line breaks always separate segments; within a line, segments are sentences.
+LINE_BREAK = re.compile(r'(\s*\n\s*)')
+TRANSLATE_MODEL = "mayura:v1"
+
+
+def normalize_text(text):
+    """Collapse whitespace so trivially different copies of a sentence share a cache entry."""
+    return " ".join(text.split())
+
+
+def split_long_segment(text, max_chars):
+    """Split a segment longer than `max_chars` at word boundaries."""
+    pieces = []
+    while len(text) > max_chars:
+        cut = text.rfind(" ", 0, max_chars)
+        if cut <= 0:
+            cut = max_chars
+        pieces.append(text[:cut].strip())
+        text = text[cut:].strip()
+    if text:
+        pieces.append(text)
+    return pieces
+
+
+class TranslationService:
+    """Single entry point for every Sarvam translate call made by the API."""
+
+    def __init__(self, http, api_url, api_key, cache_max_bytes, cache_ttl=None, max_chars=950,
+                 max_concurrency=4, async_http=None):
+        self.http = http
+        self.async_http = async_http
+        self.api_url = api_url
+        self.api_key = api_key
+        self.max_chars = max_chars
+        self.max_concurrency = max_concurrency
+        self.cache = LRUCache(cache_max_bytes, ttl=cache_ttl, sizeof=lambda value: len(value.encode("utf-8")))
+
+    @staticmethod
+    def _cache_key(text, options):
+        canonical = json.dumps([text, options], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def _segment(self, text):
+        """Return (segments, separators) such that interleaving them rebuilds `text`."""
+        segments, separators = [], []
+        for i, part in enumerate(LINE_BREAK.split(text)):
+            if i % 2:
+                separators.append(part)
+                continue
+
+            sentences = split_sentences(part) or [""]
+            for j, sentence in enumerate(sentences):
+                if j:
+                    # The whitespace between two sentences on a line.
+                    separators.append(sentence[:len(sentence) - len(sentence.lstrip())] or " ")
+                pieces = split_long_segment(normalize_text(sentence), self.max_chars) or [""]
+                for k, piece in enumerate(pieces):
+                    if k:
+                        separators.append(" ")
+                    segments.append(piece)
+        return segments, separators
+
+    def _chunks(self, segments):
+        """Group consecutive non-empty segments into chunks that stay under the API's input limit."""
+        chunks, current, current_len = [], [], 0
+        for i, segment in enumerate(segments):
+            if not segment:
+                continue
+            size = len(segment) + 1
+            contiguous = current and current[-1] == i - 1
+            if current and (not contiguous or current_len + size > self.max_chars):
+                chunks.append(current)
+                current, current_len = [], 0
+            current.append(i)
+            current_len += size
+        if current:
+            chunks.append(current)
+        return chunks
+
+    @staticmethod
+    def _chunk_text(chunk, segments, separators):
+        """The request text for a chunk: its segments, with line and paragraph breaks kept and other whitespace as one space."""
+        text = segments[chunk[0]]
+        for i in chunk[1:]:
+            breaks = min(separators[i - 1].count("\n"), 2)
+            text += ("\n" * breaks or " ") + segments[i]
+        return text
+
+    def _request_args(self, text, options):
+        payload = {
+            "input": text,
+            "source_language_code": options["source_language_code"],
+            "target_language_code": options["target_language_code"],
+            "speaker_gender": options["speaker_gender"],
+            "mode": options["mode"],
+            "model": TRANSLATE_MODEL,
+            "enable_preprocessing": False,
+            "output_script": options["output_script"],
+            "numerals_format": options["numerals_format"]
+        }
+
+        headers = {
+            "Content-Type": "application/json",
+            "api-subscription-key": self.api_key
+        }
+        return {"json": payload, "headers": headers}
+
+    @staticmethod
+    def _response_data(response):
+        """The JSON body of a translate response. A body that isn't a JSON object
+        (e.g. a proxy's HTML error page) becomes an error, so only that chunk fails."""
+        try:
+            response_data = response.json()
+        except ValueError:
+            response_data = None
+        if not isinstance(response_data, dict):
+            return {"error": {"message": f"Translate API returned a non-JSON response (HTTP {response.status_code})"}}
+        return response_data
+
+    def _parse_chunk(self, text, response_data, options):
+        """Turn one translate response into the chunk's translation (and cache it)."""
+        if "translated_text" not in response_data:
+            return {
+                "error": response_data.get("error", {}).get("message", "Translation failed"),
+                "request_id": response_data.get("error", {}).get("request_id", "unknown"),
+                "details": response_data
+            }
+
+        translation = response_data["translated_text"].strip()
+        self.cache.set(self._cache_key(text, options), translation)
+        return {
+            "translation": translation,
+            "request_id": response_data.get("request_id", "unknown"),
+            "source_language_code": response_data.get("source_language_code", "unknown")
+        }
+
+    def _translate_chunk(self, text, options):
+        """Translate one chunk in one request."""
+        response = self.http.post(self.api_url, **self._request_args(text, options))
+        return self._parse_chunk(text, self._response_data(response), options)
+
+    async def _atranslate_chunk(self, text, options):
+        """Async version of `_translate_chunk`."""
+        response = await self.async_http.post(self.api_url, **self._request_args(text, options))
+        return self._parse_chunk(text, self._response_data(response), options)
+
+    def _plan(self, text, options):
+        """Split `text` into segments and chunks, and look each chunk up in the cache."""
+        segments, separators = self._segment(text)
+        chunks = self._chunks(segments)
+        texts = [self._chunk_text(chunk, segments, separators) for chunk in chunks]
+        translations = [self.cache.get(self._cache_key(chunk_text, options)) for chunk_text in texts]
+        return {
+            "segments": segments,
+            "separators": separators,
+            "chunks": chunks,
+            "texts": texts,
+            "translations": translations,
+            "missing": [k for k, translation in enumerate(translations) if translation is None]
+        }
+
+    @staticmethod
+    def _assemble(plan, results, source_lang):
+        """Put chunk results back into the text and build the service's result dict."""
+        segments, separators, chunks = plan["segments"], plan["separators"], plan["chunks"]
+        translations = list(plan["translations"])
+
+        request_id = "cached"
+        detected_source = source_lang
+        failed_chunks = []
+        for chunk_index, result in zip(plan["missing"], results):
+            if "error" in result:
+                failed_chunks.append(dict(result, chunk_index=chunk_index))
+                translations[chunk_index] = plan["texts"][chunk_index]
+                continue
+            translations[chunk_index] = result["translation"]
+            request_id = result["request_id"]
+            detected_source = result["source_language_code"]
+
+        if plan["missing"] and len(failed_chunks) == len(plan["missing"]):
+            error = {key: value for key, value in failed_chunks[0].items() if key != "chunk_index"}
+            error.setdefault("request_id", "unknown")
+            return error
+
+        # Walk the segments, replacing each chunk's run of segments (and the separators inside it) with its translation.
+        chunk_at = {chunk[0]: k for k, chunk in enumerate(chunks)}
+        pieces = []
+        i = 0
+        while i < len(segments):
+            if i in chunk_at:
+                k = chunk_at[i]
+                pieces.append(translations[k])
+                i = chunks[k][-1]
+            else:
+                pieces.append(segments[i])
+            if i < len(separators):
+                pieces.append(separators[i])
+            i += 1
+
+        missing = set(plan["missing"])
+        return {
+            "translated_text": "".join(pieces).strip(),
+            "request_id": request_id,
+            "source_language_code": detected_source,
+            "requests_count": len(plan["missing"]) - len(failed_chunks),
+            "cached_segments": sum(len(chunk) for k, chunk in enumerate(chunks) if k not in missing),
+            "failed_chunks": failed_chunks
+        }
+
+    @staticmethod
+    def _options(source_lang, target_lang, speaker_gender, mode, output_script, numerals_format):
+        return {
+            "source_language_code": source_lang,
+            "target_language_code": target_lang,
+            "speaker_gender": speaker_gender,
+            "mode": mode,
+            "output_script": output_script,
+            "numerals_format": numerals_format
+        }
+
+    def translate(self, text, source_lang, target_lang, speaker_gender="Female", mode="formal",
+                  output_script="fully-native", numerals_format="international"):
+        """Translate `text`, only sending chunks that aren't cached yet.
+
+        Uncached chunks are sent concurrently, one request each, at most
+        `max_concurrency` at a time. Returns a dict with `translated_text` on
+        success. When only some requests fail, their chunks are kept in the
+        source language and described in `failed_chunks`. When every request
+        fails, the dict has `error`, `request_id` and `details` instead. Network
+        errors count as failed requests.
+        """
+        options = self._options(source_lang, target_lang, speaker_gender, mode, output_script, numerals_format)
+        plan = self._plan(text, options)
+        texts = [plan["texts"][k] for k in plan["missing"]]
+
+        def translate_chunk(chunk_text):
+            try:
+                return self._translate_chunk(chunk_text, options)
+            except requests.exceptions.RequestException as e:
+                return {"error": "API request failed", "details": str(e)}
+
+        workers = max(1, min(self.max_concurrency, len(texts)))
+        if workers == 1:
+            results = [translate_chunk(chunk_text) for chunk_text in texts]
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="translate") as pool:
+                # Run each chunk in a copy of this context so its upstream timings count towards the request.
+                futures = [pool.submit(contextvars.copy_context().run, translate_chunk, chunk_text) for chunk_text in texts]
+                results = [future.result() for future in futures]
+
+        return self._assemble(plan, results, source_lang)
+
+    async def atranslate(self, text, source_lang, target_lang, speaker_gender="Female", mode="formal",
+                         output_script="fully-native", numerals_format="international"):
+        """Async version of `translate`, for the ASGI serving mode (needs `async_http`)."""
+        options = self._options(source_lang, target_lang, speaker_gender, mode, output_script, numerals_format)
+        plan = self._plan(text, options)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def translate_chunk(chunk_text):
+            async with semaphore:
+                try:
+                    return await self._atranslate_chunk(chunk_text, options)
+                except requests.exceptions.RequestException as e:
+                    return {"error": "API request failed", "details": str(e)}
+
+        results = await asyncio.gather(*(translate_chunk(plan["texts"][k]) for k in plan["missing"]))
+        return self._assemble(plan, results, source_lang)
+
+    def stats(self):
+        return self.cache.stats()
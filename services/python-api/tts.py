@@ -0,0 +1,200 @@
+"""Helpers for synthesizing multi-chunk text-to-speech requests."""
+import asyncio
+import contextvars
+import hashlib
+import json
+import re
+import threading
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+
+from cache import DiskCache, LRUCache
+from sentences import SENTENCE_END, is_abbreviation
+
+# Where a chunk may end, from best to worst: the end of a sentence (see sentences.py;
+# the full stop of "Rs. 10" or "p.a." doesn't count) or a line break; the end of a
+# clause; any space. Past those, chunks are cut between grapheme clusters.
+TTS_BOUNDARIES = [
+    re.compile(rf'{SENTENCE_END.pattern}|\n'),
+    re.compile(r'[,;:—–]["\'”’)\]]*(?=\s)'),
+    re.compile(r'\s+')
+]
+ZERO_WIDTH_JOINERS = {"\u200c", "\u200d"}
+
+
+def _split_after(text, pattern, skip=None):
+    """Split text after every match of `pattern` (except those `skip(text, match)` rejects), dropping blank pieces."""
+    pieces = []
+    start = 0
+    for match in pattern.finditer(text):
+        if skip is not None and skip(text, match):
+            continue
+        pieces.append(text[start:match.end()])
+        start = match.end()
+    pieces.append(text[start:])
+    return [" ".join(piece.split()) for piece in pieces if piece.strip()]
+
+
+def grapheme_clusters(text):
+    """Split text into grapheme clusters: a base character with its combining marks,
+    and Indic conjuncts (consonants joined by a virama or a zero-width joiner) kept whole."""
+    clusters = []
+    for ch in text:
+        joined = clusters and (
+            unicodedata.category(ch) in ("Mn", "Mc", "Me")
+            or ch in ZERO_WIDTH_JOINERS
+            or unicodedata.combining(clusters[-1][-1]) == 9  # after a virama
+            or clusters[-1][-1] in ZERO_WIDTH_JOINERS
+        )
+        if joined:
+            clusters[-1] += ch
+        else:
+            clusters.append(ch)
+    return clusters
+
+
+def _pack(pieces, limit, separator=" "):
+    """Greedily join consecutive pieces into chunks of at most `limit` characters."""
+    chunks = []
+    for piece in pieces:
+        if chunks and len(chunks[-1]) + len(separator) + len(piece) <= limit:
+            chunks[-1] += separator + piece
+        else:
+            chunks.append(piece)
+    return chunks
+
+
+def _split_to_limit(text, limit, level=0):
+    if len(text) <= limit:
+        return [text]
+    if level == len(TTS_BOUNDARIES):
+        return _pack(grapheme_clusters(text), limit, separator="")
+    pieces = [
+        chunk
+        for piece in _split_after(text, TTS_BOUNDARIES[level])
+        for chunk in _split_to_limit(piece, limit, level + 1)
+    ]
+    return _pack(pieces, limit)
+
+
+def split_tts_text(text, limit):
+    """Split text into the non-blank chunks sent to Sarvam TTS one request each.
+
+    Each chunk holds as many whole sentences as fit in `limit` characters, so an
+    answer takes as few requests as possible. A sentence longer than the limit
+    is split at clause punctuation, then between words, and only a single word
+    longer than the limit is cut, between grapheme clusters. Boundaries depend
+    only on the text, so the same answer always gives the same chunks (and hits
+    the TTS cache).
+    """
+    return _pack(
+        [
+            chunk
+            for sentence in _split_after(text, TTS_BOUNDARIES[0], skip=is_abbreviation)
+            for chunk in _split_to_limit(sentence, limit, 1)
+        ],
+        limit
+    )
+
+
+def iter_synthesized_chunks(chunks, synthesize, max_concurrency=4):
+    """Synthesize text chunks concurrently, yielding their audio in the original order.
+
+    `synthesize` is called once per chunk and returns the decoded audio bytes,
+    or None when that chunk failed and should be skipped. At most
+    `max_concurrency` chunks are in flight at a time for one request, and each
+    result is yielded as soon as it and every chunk before it are ready.
+    """
+    if not chunks:
+        return
+
+    workers = max(1, min(max_concurrency, len(chunks)))
+    if workers == 1:
+        for chunk in chunks:
+            yield synthesize(chunk)
+        return
+
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tts")
+    try:
+        # Each chunk runs in a copy of this context so its timings count towards the request.
+        futures = [pool.submit(contextvars.copy_context().run, synthesize, chunk) for chunk in chunks]
+        for future in futures:
+            yield future.result()
+    finally:
+        # If a chunk raised or the consumer went away (e.g. a streaming client
+        # disconnected), don't leave the remaining chunks queued behind it.
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def aiter_synthesized_chunks(chunks, synthesize, max_concurrency=4):
+    """Async version of `iter_synthesized_chunks`, where `synthesize` is a coroutine function."""
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def run(chunk):
+        async with semaphore:
+            return await synthesize(chunk)
+
+    tasks = [asyncio.ensure_future(run(chunk)) for chunk in chunks]
+    try:
+        for task in tasks:
+            yield await task
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+class TTSAudioCache:
+    """Content-addressed cache of synthesized chunk audio.
+
+    Entries are keyed on the full TTS request body for a chunk (text, language,
+    speaker, model, pitch/pace/loudness, sample rate, ...), so any change to the
+    voice settings naturally misses. A bounded in-memory LRU tier sits in front
+    of an optional on-disk tier of raw audio files, capped at `disk_max_bytes`.
+    """
+
+    def __init__(self, max_bytes, directory=None, disk_max_bytes=None):
+        self.memory = LRUCache(max_bytes)
+        self.disk = DiskCache(directory, suffix=".audio", max_bytes=disk_max_bytes) if directory else None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key_for(request_body):
+        canonical = json.dumps(request_body, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        audio = self.memory.get(key)
+        if audio is None and self.disk is not None:
+            audio = self.disk.get(key)
+            if audio is not None:
+                self.memory.set(key, audio)
+                with self._lock:
+                    self.disk_hits += 1
+
+        with self._lock:
+            if audio is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return audio
+
+    def set(self, key, audio):
+        self.memory.set(key, audio)
+        if self.disk is not None:
+            self.disk.set(key, audio)
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.memory.evictions,
+            "entries": len(self.memory),
+            "bytes": self.memory.current_bytes,
+            "max_bytes": self.memory.max_bytes,
+            "disk_enabled": self.disk is not None,
+            "disk": self.disk.stats() if self.disk is not None else None
+        }
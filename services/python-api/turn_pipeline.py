@@ -0,0 +1,90 @@
+"""Overlapping translate -> TTS pipeline for the sentences of a streamed answer.
+
+`TurnPipeline.add()` is called with each spoken sentence as soon as the LLM has
+finished it. Every sentence is translated and then synthesized in a worker
+thread, so while the model is still writing later sentences the earlier ones
+are already being translated and spoken. `events()` hands back the results in
+sentence order: a `text` event when a sentence's final text is known, then an
+`audio` event when its audio is ready.
+"""
+import base64
+import contextvars
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class TurnPipeline:
+    """Translates and synthesizes sentences concurrently, reporting them in order.
+
+    `translate(text)` returns the text to speak (or None to keep the original)
+    and may be None when no translation is needed; `synthesize(text)` returns
+    WAV bytes, or None if synthesis failed. At most `max_concurrency` sentences
+    are in flight at once. `on_update()`, if given, is called from the worker
+    thread whenever a sentence's text or audio becomes ready, so a caller can
+    wake up and send the new events.
+    """
+
+    def __init__(self, translate, synthesize, max_concurrency=4, on_update=None):
+        self.translate = translate
+        self.synthesize = synthesize
+        self.on_update = on_update or (lambda: None)
+        self.pool = ThreadPoolExecutor(max_workers=max(1, max_concurrency), thread_name_prefix="turn")
+        self.segments = []
+        self.next_index = 0
+
+    def add(self, text):
+        segment = {"source": text, "text": Future(), "audio": Future(), "text_sent": False}
+        self.segments.append(segment)
+        # Each sentence runs in a copy of this context so its timings count towards the request.
+        self.pool.submit(contextvars.copy_context().run, self._run, segment)
+
+    def _run(self, segment):
+        text = segment["source"]
+        if self.translate is not None:
+            try:
+                text = self.translate(text) or text
+            except Exception as e:
+                logging.warning(f"Translation failed for a turn sentence; speaking it untranslated: {str(e)}")
+        segment["text"].set_result(text)
+        self.on_update()
+        try:
+            segment["audio"].set_result(self.synthesize(text))
+        except Exception as e:
+            segment["audio"].set_exception(e)
+        self.on_update()
+
+    def events(self, wait=False):
+        """Yield (event, data) for finished sentences, in order.
+
+        Without `wait` this stops at the first sentence that isn't ready yet; with
+        it, it waits for every sentence added so far.
+        """
+        while self.next_index < len(self.segments):
+            index = self.next_index
+            segment = self.segments[index]
+
+            if not segment["text_sent"]:
+                if not (wait or segment["text"].done()):
+                    return
+                segment["text_sent"] = True
+                yield "text", {"index": index, "text": segment["text"].result()}
+
+            if not (wait or segment["audio"].done()):
+                return
+            self.next_index += 1
+            yield "audio", self._audio_event(index, segment["audio"])
+
+    @staticmethod
+    def _audio_event(index, future):
+        try:
+            audio = future.result()
+        except Exception as e:
+            logging.error(f"TTS failed for turn sentence {index}: {str(e)}")
+            audio = None
+        if audio is None:
+            return {"index": index, "audio": None, "error": "Failed to generate audio"}
+        return {"index": index, "audio": base64.b64encode(audio).decode("ascii"), "mime_type": "audio/wav"}
+
+    def close(self):
+        # If the client went away, don't synthesize sentences nobody will hear.
+        self.pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,323 @@
+"""Shared HTTP client for calls to upstream APIs (Sarvam).
+
+Keeps one pooled keep-alive session per host, applies explicit connect/read
+timeouts, retries 429/5xx responses and connection failures with jittered
+exponential backoff within a total time budget, and trips a per-host circuit
+breaker so requests fail fast while an upstream is down instead of tying up
+workers. Every attempt, retry and
+failure is recorded in the metrics registry (see metrics.py).
+"""
+import asyncio
+import logging
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import registry, timer
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+# A retry is only started if it would get at least this long to read a response within the budget.
+MIN_READ_TIMEOUT = 1.0
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised without contacting the upstream while its circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures and lets a single
+    trial request through once `reset_timeout` seconds have passed."""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def release(self):
+        """Free the trial slot of a request that ended without a verdict on the upstream (e.g. it was cancelled)."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                # Either the half-open trial failed or we just crossed the threshold.
+                self.opened_at = time.monotonic()
+
+
+class UpstreamClient:
+    """Pooled, retrying HTTP client. Use `post()` like `requests.post()`.
+
+    One `post()` spends at most about `max_total_time` seconds across all its
+    attempts and backoff sleeps: later attempts get a shorter read timeout, and
+    no retry is started once the budget is used up. Keep it below the worker
+    timeout (gunicorn's default is 30 s) so workers aren't killed mid-retry.
+    """
+
+    def __init__(self, pool_maxsize=20, connect_timeout=3.05, read_timeout=30.0,
+                 max_retries=2, backoff_base=0.25, backoff_max=4.0,
+                 failure_threshold=5, reset_timeout=30.0, max_total_time=25.0):
+        self.pool_maxsize = pool_maxsize
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_total_time = max_total_time
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._sessions = {}
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def _new_session(self, host):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize, max_retries=0)
+        session.mount(host, adapter)
+        return session
+
+    def _host_state(self, url):
+        parts = urlsplit(url)
+        host = f"{parts.scheme}://{parts.netloc}"
+        with self._lock:
+            if host not in self._sessions:
+                self._sessions[host] = self._new_session(host)
+                self._breakers[host] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return host, self._sessions[host], self._breakers[host]
+
+    def _backoff(self, attempt, response=None):
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.backoff_max)
+        # "Full jitter": spreads retries from many workers instead of having them retry in lockstep.
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _attempt_timeout(self, deadline):
+        """(connect, read) timeout for the next attempt, cut down so it ends by `deadline`."""
+        connect_timeout, read_timeout = self.timeout
+        remaining = deadline - time.monotonic() - connect_timeout
+        return connect_timeout, max(MIN_READ_TIMEOUT, min(read_timeout, remaining))
+
+    def _can_retry(self, deadline, delay):
+        """Whether a retry after sleeping `delay` would still fit in the time budget."""
+        return deadline - time.monotonic() - delay >= self.timeout[0] + MIN_READ_TIMEOUT
+
+    @staticmethod
+    def _target(url):
+        """Metrics label for an upstream endpoint, e.g. "api.sarvam.ai/translate"."""
+        parts = urlsplit(url)
+        return parts.netloc + parts.path
+
+    @staticmethod
+    def _stage(url):
+        """Stage name for the request timing breakdown, e.g. "upstream_translate"."""
+        return "upstream_" + urlsplit(url).path.strip("/").replace("/", "_")
+
+    @staticmethod
+    def _record_attempt(target, started, outcome):
+        registry.observe("upstream_request_duration_seconds", time.perf_counter() - started, upstream=target)
+        registry.inc("upstream_requests_total", upstream=target, outcome=outcome)
+
+    @staticmethod
+    def _record_error(target, kind):
+        registry.inc("upstream_errors_total", upstream=target, kind=kind)
+
+    @staticmethod
+    def _rewind(kwargs):
+        """Seek uploaded file objects back to the start so a retry resends them in full."""
+        for value in (kwargs.get("files") or {}).values():
+            file_obj = value[1] if isinstance(value, tuple) else value
+            if hasattr(file_obj, "seek"):
+                file_obj.seek(0)
+
+    def post(self, url, **kwargs):
+        with timer(self._stage(url)):
+            return self._post(url, **kwargs)
+
+    def _post(self, url, **kwargs):
+        host, session, breaker = self._host_state(url)
+        target = self._target(url)
+        if not breaker.allow():
+            self._record_error(target, "circuit_open")
+            raise CircuitOpenError(f"Circuit breaker open for {host}; not sending request")
+
+        deadline = time.monotonic() + self.max_total_time
+        timeout = kwargs.pop("timeout", None)
+        try:
+            for attempt in range(self.max_retries + 1):
+                last_attempt = attempt == self.max_retries
+                if attempt:
+                    self._rewind(kwargs)
+
+                started = time.perf_counter()
+                try:
+                    response = session.post(url, timeout=timeout or self._attempt_timeout(deadline), **kwargs)
+                except requests.exceptions.RequestException as e:
+                    self._record_attempt(target, started, type(e).__name__)
+                    retryable = isinstance(e, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+                    delay = self._backoff(attempt)
+                    if last_attempt or not retryable or not self._can_retry(deadline, delay):
+                        breaker.record_failure()
+                        self._record_error(target, "timeout" if isinstance(e, requests.exceptions.Timeout) else "connection")
+                        raise
+                    logging.warning(f"Upstream request to {host} failed ({e}); retrying in {delay:.2f}s")
+                    registry.inc("upstream_retries_total", upstream=target)
+                    time.sleep(delay)
+                    continue
+
+                self._record_attempt(target, started, str(response.status_code))
+                if response.status_code in RETRY_STATUS_CODES and not last_attempt:
+                    delay = self._backoff(attempt, response)
+                    if self._can_retry(deadline, delay):
+                        logging.warning(f"Upstream {host} returned {response.status_code}; retrying in {delay:.2f}s")
+                        registry.inc("upstream_retries_total", upstream=target)
+                        time.sleep(delay)
+                        continue
+                break
+        except requests.exceptions.RequestException:
+            raise
+        except BaseException:
+            # Anything else (a bad argument, an interrupted worker) says nothing about the
+            # upstream's health, but a half-open trial must not hold the breaker shut forever.
+            breaker.release()
+            raise
+
+        if response.status_code >= 400:
+            self._record_error(target, f"http_{response.status_code // 100}xx")
+        if response.status_code >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return response
+
+    def stats(self):
+        with self._lock:
+            return {
+                host: {"circuit": breaker.state, "consecutive_failures": breaker.failures}
+                for host, breaker in self._breakers.items()
+            }
+
+
+class AsyncUpstreamClient(UpstreamClient):
+    """`UpstreamClient` for the ASGI serving mode, built on pooled `httpx.AsyncClient`s.
+
+    Transport failures are re-raised as `requests` exceptions so both serving
+    modes share the same error handling.
+    """
+
+    def _new_session(self, host):
+        connect_timeout, read_timeout = self.timeout
+        return httpx.AsyncClient(
+            base_url=host,
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=self.pool_maxsize, max_keepalive_connections=self.pool_maxsize)
+        )
+
+    async def post(self, url, **kwargs):
+        with timer(self._stage(url)):
+            return await self._post(url, **kwargs)
+
+    async def _post(self, url, **kwargs):
+        host, session, breaker = self._host_state(url)
+        target = self._target(url)
+        if not breaker.allow():
+            self._record_error(target, "circuit_open")
+            raise CircuitOpenError(f"Circuit breaker open for {host}; not sending request")
+
+        deadline = time.monotonic() + self.max_total_time
+        timeout = kwargs.pop("timeout", None)
+        try:
+            for attempt in range(self.max_retries + 1):
+                last_attempt = attempt == self.max_retries
+                if attempt:
+                    self._rewind(kwargs)
+
+                started = time.perf_counter()
+                try:
+                    if timeout is None:
+                        connect_timeout, read_timeout = self._attempt_timeout(deadline)
+                        attempt_timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+                    else:
+                        attempt_timeout = timeout
+                    response = await session.post(url, timeout=attempt_timeout, **kwargs)
+                except httpx.HTTPError as e:
+                    self._record_attempt(target, started, type(e).__name__)
+                    retryable = isinstance(e, httpx.TransportError)
+                    delay = self._backoff(attempt)
+                    if last_attempt or not retryable or not self._can_retry(deadline, delay):
+                        breaker.record_failure()
+                        if isinstance(e, httpx.TimeoutException):
+                            self._record_error(target, "timeout")
+                            raise requests.exceptions.Timeout(str(e)) from e
+                        self._record_error(target, "connection")
+                        raise requests.exceptions.ConnectionError(str(e)) from e
+                    logging.warning(f"Upstream request to {host} failed ({e}); retrying in {delay:.2f}s")
+                    registry.inc("upstream_retries_total", upstream=target)
+                    await asyncio.sleep(delay)
+                    continue
+
+                self._record_attempt(target, started, str(response.status_code))
+                if response.status_code in RETRY_STATUS_CODES and not last_attempt:
+                    delay = self._backoff(attempt, response)
+                    if self._can_retry(deadline, delay):
+                        logging.warning(f"Upstream {host} returned {response.status_code}; retrying in {delay:.2f}s")
+                        registry.inc("upstream_retries_total", upstream=target)
+                        await asyncio.sleep(delay)
+                        continue
+                break
+        except requests.exceptions.RequestException:
+            raise
+        except BaseException:
+            # Cancelled (e.g. the client disconnected, or a TTS chunk was abandoned): free a
+            # half-open trial slot, or every later call would fail fast with CircuitOpenError.
+            breaker.release()
+            raise
+
+        if response.status_code >= 400:
+            self._record_error(target, f"http_{response.status_code // 100}xx")
+        if response.status_code >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        return response
+
+    async def aclose(self):
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+            self._breakers.clear()
+        for session in sessions:
+            await session.aclose()